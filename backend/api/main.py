@@ -6,6 +6,7 @@ load_dotenv(dotenv_path=dotenv_path)
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from typing import List, Optional
@@ -18,8 +19,15 @@ from backend.db.models import Product as DBProduct
 from backend.db.models import ScraperConfig as DBScraperConfig
 from backend.db import models
 from backend.db.database import SessionLocal, engine
-from backend.llm.engine import InsightEngine
+from backend.llm.engine import InsightEngine, AsyncInsightEngine
+from backend.llm.answer_cache import get_corpus_version, lookup_answer, store_answer, replay_answer
 from backend.pipeline.tasks import run_full_ingest_task
+from backend.pipeline.stats import get_product_stats
+from backend.pipeline.embeddings import (
+    warm_query_cache_in_background, enable_query_batching,
+    query_cache_stats, query_batcher_stats, embedding_cache_stats, embedding_batching_stats
+)
+from backend.reports.sections import REPORT_SECTIONS
 from backend.reports.report_gen import generate_and_email_report_task
 from backend.api import schemas
 from backend.api.auth import get_current_user_id, get_user_email
@@ -34,8 +42,13 @@ limiter = Limiter(key_func=get_remote_address, storage_uri=REDIS_URL, default_li
 # Create database tables if they don't exist
 models.Base.metadata.create_all(bind=engine)
 
+# /ask runs on the async engine so waiting on Qdrant and the LLM doesn't hold a threadpool
+# thread per request; ASK_ENGINE=sync restores the thread-based engine for comparison
+ASK_ENGINE = os.getenv("ASK_ENGINE", "async").lower()
+ASK_RATE_LIMIT = os.getenv("ASK_RATE_LIMIT", "10/minute")
+
 # Create a single instance of the InsightEngine
-insight_engine = InsightEngine()
+insight_engine = AsyncInsightEngine() if ASK_ENGINE == "async" else InsightEngine()
 
 origins = [
     "http://localhost:3000", # Default Next.js port
@@ -61,6 +74,13 @@ app.add_middleware(
     allow_headers=["*"],    # Allows all headers (like Authorization)
 )
 
+@app.on_event("startup")
+def warm_query_embeddings():
+    """Pre-embeds the report section questions, the most frequently repeated queries."""
+    # Concurrent /ask requests share encode calls instead of each encoding a batch of one
+    enable_query_batching()
+    warm_query_cache_in_background(REPORT_SECTIONS.values())
+
 # --- Pydantic Models ---
 class QuestionRequest(BaseModel):
     question: str
@@ -82,6 +102,20 @@ async def read_root(request: Request):
     """Root endpoint for basic API check."""
     return {"message": "Welcome to InsightGenie API"}
 
+@app.get("/stats/embeddings")
+@limiter.limit("60/minute")
+async def read_embedding_stats(
+    request: Request,
+    owner_id: int = Depends(get_current_user_id)
+):
+    """Hit rates of the embedding caches and query micro-batching metrics for this process."""
+    return {
+        "query_cache": query_cache_stats(),
+        "query_batcher": query_batcher_stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "embedding_batching": embedding_batching_stats(),
+    }
+
 # --- Product CRUD Endpoints ---
 
 @app.post("/products", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
@@ -242,10 +276,15 @@ async def delete_product(
 async def trigger_ingestion(
     request: Request,
     product_id: int,
+    incremental: bool = False,
     db: Session = Depends(get_db),
     owner_id: int = Depends(get_current_user_id)
 ):
-    """Queues the data ingestion task for a specific product."""
+    """
+    Queues the data ingestion task for a specific product.
+    With `?incremental=true` only data newer than the last ingest is scraped, and items
+    already stored with identical content are not re-scored or re-embedded.
+    """
     product = db.query(models.Product).filter(
         models.Product.id == product_id,
         models.Product.owner_id == owner_id
@@ -253,14 +292,25 @@ async def trigger_ingestion(
     if not product:
         raise HTTPException(status_code=404, detail="Product not found or access denied")
 
-    run_full_ingest_task.delay(product_id)
+    run_full_ingest_task.delay(product_id, incremental=incremental)
     return {
         "status": "queued",
+        "mode": "incremental" if incremental else "full",
         "message": f"Ingestion task for product {product_id} has been queued."
     }
 
+def _load_ask_context(db: Session, product_id: int, owner_id: int):
+    """Blocking DB lookups for /ask, run in the threadpool: the product name and corpus stats."""
+    product = db.query(models.Product).filter(
+        models.Product.id == product_id,
+        models.Product.owner_id == owner_id
+    ).first()
+    if not product:
+        return None, None
+    return str(product.name), get_product_stats(db, product_id)
+
 @app.post("/products/{product_id}/ask")
-@limiter.limit("10/minute")
+@limiter.limit(ASK_RATE_LIMIT)
 async def ask_question(
     request: Request,
     product_id: int,
@@ -269,22 +319,31 @@ async def ask_question(
     owner_id: int = Depends(get_current_user_id)
 ):
     """Streams an AI-generated answer based on feedback for a specific product."""
-    product = db.query(models.Product).filter(
-        models.Product.id == product_id,
-        models.Product.owner_id == owner_id
-    ).first()
-    if not product:
+    product_name, corpus_stats = await run_in_threadpool(_load_ask_context, db, product_id, owner_id)
+    if product_name is None:
         raise HTTPException(status_code=404, detail="Product not found or access denied")
 
-    product_name = str(product.name)
+    question = question_request.question
 
     try:
+        # Near-identical questions about the same corpus version are replayed from Redis
+        corpus_version = await run_in_threadpool(get_corpus_version, product_id)
+        cached_answer = await run_in_threadpool(lookup_answer, product_id, question, corpus_version)
+        if cached_answer is not None:
+            return StreamingResponse(
+                replay_answer(cached_answer),
+                media_type="text/event-stream",
+                headers={"X-Answer-Cache": "hit"}
+            )
+
         generator = insight_engine.answer_question(
-            question=question_request.question,
+            question=question,
             product_id=product_id,
-            product_name=product_name
+            product_name=product_name,
+            corpus_stats=corpus_stats,
+            on_complete=lambda answer: store_answer(product_id, question, answer, corpus_version)
         )
-        return StreamingResponse(generator, media_type="text/event-stream")
+        return StreamingResponse(generator, media_type="text/event-stream", headers={"X-Answer-Cache": "miss"})
     except Exception as e:
         print(f"Error during /ask endpoint: {e}")
         return StreamingResponse(
@@ -293,6 +352,24 @@ async def ask_question(
             status_code=500
         )
 
+@app.get("/products/{product_id}/stats", response_model=schemas.ProductStats)
+@limiter.limit("60/minute")
+async def read_product_stats(
+    request: Request,
+    product_id: int,
+    db: Session = Depends(get_db),
+    owner_id: int = Depends(get_current_user_id)
+):
+    """Returns whole-corpus sentiment and source counts for a product, maintained at ingest time."""
+    product = db.query(models.Product).filter(
+        models.Product.id == product_id,
+        models.Product.owner_id == owner_id
+    ).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found or access denied")
+
+    return {"product_id": product_id, **get_product_stats(db, product_id)}
+
 @app.post("/products/{product_id}/email-report", status_code=status.HTTP_202_ACCEPTED)
 @limiter.limit("5/minute")
 async def email_product_report(
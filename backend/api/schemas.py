@@ -1,6 +1,6 @@
 # backend/api/schemas.py
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 # --- Scraper Config Schemas ---
 class ScraperConfigBase(BaseModel):
@@ -32,4 +32,13 @@ class Product(BaseModel):
     config: Optional[ScraperConfig] = None
 
     class Config:
-        orm_mode = True # For SQLAlchemy compatibility (use from_attributes = True in Pydantic v2)
\ No newline at end of file
+        orm_mode = True # For SQLAlchemy compatibility (use from_attributes = True in Pydantic v2)
+
+# --- Stats Schemas ---
+class ProductStats(BaseModel):
+    product_id: int
+    total: int
+    sentiment_counts: Dict[str, int]
+    sentiment_breakdown: Dict[str, float]
+    average_compound: float
+    source_counts: Dict[str, int]
\ No newline at end of file
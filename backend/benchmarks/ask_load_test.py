@@ -0,0 +1,110 @@
+"""
+Concurrent load test for the streaming /ask endpoint.
+
+Fires `--requests` questions at each concurrency level and reports time-to-first-byte and
+total latency percentiles, throughput and errors. Run it once against an API started with
+ASK_ENGINE=sync and once with ASK_ENGINE=async (the default) to compare the two engines.
+Raise ASK_RATE_LIMIT on the server first, or the limiter rejects most requests.
+
+To measure the engines rather than the semantic answer cache, also start the server with
+ANSWER_CACHE_ENABLED=false; replayed answers are counted per level as cache hits.
+
+    python -m backend.benchmarks.ask_load_test --url http://localhost:8000 \\
+        --token "$TOKEN" --product-id 1 --concurrency 1 8 32 --requests 64
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+import httpx
+
+from backend.reports.sections import REPORT_SECTIONS
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def _ask(client: httpx.AsyncClient, url: str, question: str) -> dict:
+    started = time.perf_counter()
+    first_byte = None
+    try:
+        async with client.stream("POST", url, json={"question": question}) as response:
+            async for chunk in response.aiter_text():
+                if chunk and first_byte is None:
+                    first_byte = time.perf_counter() - started
+            return {
+                "ok": response.status_code == 200,
+                "status": response.status_code,
+                "ttfb": first_byte,
+                "total": time.perf_counter() - started,
+                "cache": response.headers.get("X-Answer-Cache"),
+            }
+    except httpx.HTTPError as e:
+        return {"ok": False, "status": type(e).__name__, "ttfb": None, "total": time.perf_counter() - started, "cache": None}
+
+async def run_level(args, concurrency: int) -> dict:
+    url = f"{args.url.rstrip('/')}/products/{args.product_id}/ask"
+    questions = list(REPORT_SECTIONS.values())
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int, client: httpx.AsyncClient):
+        question = questions[i % len(questions)]
+        if not args.repeat_questions:
+            question = f"{question} (request {i})"
+        async with semaphore:
+            return await _ask(client, url, question)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=args.timeout) as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(i, client) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    ok = [r for r in results if r["ok"]]
+    ttfb = [r["ttfb"] for r in ok if r["ttfb"] is not None]
+    totals = [r["total"] for r in ok]
+    errors = {}
+    for r in results:
+        if not r["ok"]:
+            errors[str(r["status"])] = errors.get(str(r["status"]), 0) + 1
+    return {
+        "concurrency": concurrency,
+        "ok": len(ok),
+        "errors": errors,
+        "cache_hits": sum(1 for r in ok if r["cache"] == "hit"),
+        "throughput": len(ok) / elapsed if elapsed else 0.0,
+        "ttfb_p50": _percentile(ttfb, 50),
+        "ttfb_p99": _percentile(ttfb, 99),
+        "total_p50": _percentile(totals, 50),
+        "total_p99": _percentile(totals, 99),
+        "total_mean": statistics.mean(totals) if totals else 0.0,
+    }
+
+async def main_async(args):
+    print(f"{'conc':>5} {'ok':>5} {'req/s':>7} {'ttfb p50':>9} {'ttfb p99':>9} {'total p50':>10} {'total p99':>10}  errors")
+    for concurrency in args.concurrency:
+        r = await run_level(args, concurrency)
+        print(
+            f"{r['concurrency']:>5} {r['ok']:>5} {r['throughput']:>7.2f} "
+            f"{r['ttfb_p50']:>8.2f}s {r['ttfb_p99']:>8.2f}s {r['total_p50']:>9.2f}s {r['total_p99']:>9.2f}s  "
+            f"{r['errors'] or '-'}" + (f" (cache hits: {r['cache_hits']})" if r["cache_hits"] else "")
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", default="", help="Bearer token for an owner of the product")
+    parser.add_argument("--product-id", type=int, required=True)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=180.0, help="Seconds per request")
+    parser.add_argument("--repeat-questions", action="store_true", help="Send the report questions verbatim")
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
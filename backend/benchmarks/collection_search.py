@@ -0,0 +1,112 @@
+"""
+Search latency and recall benchmark for the feedback collection.
+
+For each collection and each set of search parameters, runs the same product-filtered
+queries and reports p50/p99 latency and recall@k against exact (brute-force) search on that
+collection. Query vectors are the report questions plus vectors of points sampled from the
+product, so both question-like and review-like queries are covered.
+
+Collection-level settings (HNSW m / ef_construct, on-disk vectors, quantization) are compared
+by pointing --collections at copies built with different schemas; search-time settings
+(hnsw_ef, quantization rescoring and oversampling) are varied within each run.
+
+    python -m backend.benchmarks.collection_search --product-id 1 --queries 50 --k 20
+"""
+import os
+import time
+import argparse
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+from qdrant_client import models
+
+from backend.db.qdrant_pool import get_qdrant_client
+from backend.pipeline.embeddings import get_query_embeddings
+from backend.reports.sections import REPORT_SECTIONS
+
+def _variants(hnsw_efs: list, oversamplings: list) -> dict:
+    variants = {}
+    for ef in hnsw_efs:
+        variants[f"ef={ef} full vectors"] = models.SearchParams(
+            hnsw_ef=ef, quantization=models.QuantizationSearchParams(ignore=True)
+        )
+        variants[f"ef={ef} int8, no rescore"] = models.SearchParams(
+            hnsw_ef=ef, quantization=models.QuantizationSearchParams(rescore=False)
+        )
+        for oversampling in oversamplings:
+            variants[f"ef={ef} int8, rescore x{oversampling:g}"] = models.SearchParams(
+                hnsw_ef=ef, quantization=models.QuantizationSearchParams(rescore=True, oversampling=oversampling)
+            )
+    return variants
+
+def _sample_query_vectors(client, collection: str, product_filter, count: int) -> list:
+    vectors = [vector for vector in get_query_embeddings(list(REPORT_SECTIONS.values())) if vector]
+    records, _ = client.scroll(
+        collection_name=collection,
+        scroll_filter=product_filter,
+        limit=max(0, count - len(vectors)),
+        with_payload=False,
+        with_vectors=True
+    )
+    vectors.extend(record.vector for record in records if record.vector)
+    return vectors[:count]
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))] if ordered else 0.0
+
+def benchmark_collection(client, collection: str, args) -> None:
+    product_filter = models.Filter(must=[
+        models.FieldCondition(key="product_id", match=models.MatchValue(value=args.product_id))
+    ])
+    queries = _sample_query_vectors(client, collection, product_filter, args.queries)
+    if not queries:
+        print(f"[{collection}] no points found for product {args.product_id}")
+        return
+
+    def search(vector, params):
+        return client.search(
+            collection_name=collection,
+            query_vector=vector,
+            query_filter=product_filter,
+            search_params=params,
+            limit=args.k,
+            with_payload=False
+        )
+
+    truth = [{str(hit.id) for hit in search(vector, models.SearchParams(exact=True))} for vector in queries]
+
+    info = client.get_collection(collection_name=collection)
+    print(f"\n[{collection}] {info.points_count} points, hnsw m={info.config.hnsw_config.m} "
+          f"ef_construct={info.config.hnsw_config.ef_construct}, "
+          f"quantization={'int8' if info.config.quantization_config else 'none'}, "
+          f"{len(queries)} queries, recall@{args.k}")
+    print(f"  {'variant':<32} {'p50 ms':>8} {'p99 ms':>8} {'recall':>8}")
+    for name, params in _variants(args.hnsw_ef, args.oversampling).items():
+        latencies, recalls = [], []
+        for vector, expected in zip(queries, truth):
+            started = time.perf_counter()
+            hits = search(vector, params)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if expected:
+                recalls.append(len({str(hit.id) for hit in hits} & expected) / len(expected))
+        recall = sum(recalls) / len(recalls) if recalls else 0.0
+        print(f"  {name:<32} {_percentile(latencies, 50):>8.1f} {_percentile(latencies, 99):>8.1f} {recall:>8.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--product-id", type=int, required=True)
+    parser.add_argument("--collections", nargs="+", default=["feedback_reviews"])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--hnsw-ef", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--oversampling", type=float, nargs="+", default=[1.0, 2.0, 3.0])
+    args = parser.parse_args()
+
+    client = get_qdrant_client()
+    for collection in args.collections:
+        benchmark_collection(client, collection, args)
+
+if __name__ == '__main__':
+    main()
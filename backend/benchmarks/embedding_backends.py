@@ -0,0 +1,100 @@
+"""
+Parity check and CPU throughput benchmark for the embedding backends.
+
+Parity: every backend's vectors are compared with the PyTorch (sentence-transformers)
+reference on the same corpus; the check fails if the minimum cosine similarity is
+below the backend's threshold (PARITY_THRESHOLDS). backend/tests/test_embedding_parity.py
+runs the same check in CI. Throughput: texts/sec for batch sizes 1..256.
+
+    python -m backend.benchmarks.embedding_backends
+    python -m backend.benchmarks.embedding_backends --backends onnx-int8 --int8-threshold 0.98
+"""
+import sys
+import time
+import argparse
+
+from backend.pipeline.embeddings import create_backend
+
+SAMPLE_TEXTS = [
+    "Battery life is amazing, easily lasts two days with heavy use.",
+    "The screen cracked after a week. Terrible build quality for the price.",
+    "Does anyone know if the 2024 model fixed the overheating issue?",
+    "Exhaust note is glorious but the seat gets uncomfortable after an hour on the highway.",
+    "meh",
+    "Customer support never replied to my emails about the warranty claim, very disappointed.",
+    "Great video! Subscribed.",
+    "I've owned three of these over the years and this is by far the best revision: quieter fan, "
+    "better keyboard, and the trackpad finally has decent palm rejection. Only complaint is the "
+    "charger which still gets hot and the port selection is a bit limited for creative work.",
+    "Sound quality is fine but the noise cancelling is weaker than my old pair.",
+    "Would love an option to disable the startup chime and a dark mode for the companion app.",
+]
+
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+# Minimum cosine similarity to the PyTorch vectors. fp32 ONNX runs the same graph, so only
+# float rounding differs; int8 weights drift more but must still rank texts the same way.
+PARITY_THRESHOLDS = {"torch": 1.0 - 1e-6, "onnx": 0.999, "onnx-int8": 0.97}
+
+def cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = sum(x * x for x in a) ** 0.5
+    norm_b = sum(y * y for y in b) ** 0.5
+    return dot / (norm_a * norm_b) if norm_a and norm_b else 0.0
+
+def corpus(size: int) -> list:
+    # Vary each copy slightly so no layer can short-circuit on identical inputs
+    return [f"{SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]} (#{i})" for i in range(size)]
+
+def parity(backend, texts: list, reference_vectors: list):
+    """(minimum, mean) cosine similarity of the backend's vectors to the reference vectors."""
+    similarities = [cosine(a, b) for a, b in zip(backend.encode(texts), reference_vectors)]
+    return min(similarities), sum(similarities) / len(similarities)
+
+def throughput(backend, batch_size: int, min_seconds: float = 1.0) -> float:
+    texts = corpus(batch_size)
+    backend.encode(texts, batch_size=batch_size) # Warm-up
+    encoded, started = 0, time.perf_counter()
+    while True:
+        backend.encode(texts, batch_size=batch_size) # One model call per row, at the size it reports
+        encoded += len(texts)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return encoded / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--onnx-threshold", type=float, default=PARITY_THRESHOLDS["onnx"], help="Min cosine vs PyTorch for fp32 ONNX")
+    parser.add_argument("--int8-threshold", type=float, default=PARITY_THRESHOLDS["onnx-int8"], help="Min cosine vs PyTorch for int8 ONNX")
+    parser.add_argument("--parity-size", type=int, default=200, help="Texts compared in the parity check")
+    parser.add_argument("--skip-throughput", action="store_true")
+    args = parser.parse_args()
+
+    thresholds = {**PARITY_THRESHOLDS, "onnx": args.onnx_threshold, "onnx-int8": args.int8_threshold}
+    reference = create_backend("torch")
+    parity_texts = corpus(args.parity_size)
+    reference_vectors = reference.encode(parity_texts)
+
+    failed = False
+    results = {}
+    for name in args.backends:
+        backend = reference if name == "torch" else create_backend(name)
+        worst, mean = parity(backend, parity_texts, reference_vectors)
+        passed = worst >= thresholds[name]
+        failed |= not passed
+        print(f"[{name}] parity vs torch: min cosine {worst:.5f}, mean {mean:.5f} "
+              f"(threshold {thresholds[name]}) -> {'PASS' if passed else 'FAIL'}")
+
+        if not args.skip_throughput:
+            results[name] = {size: throughput(backend, size) for size in BATCH_SIZES}
+
+    if results:
+        print("\nThroughput (texts/sec)")
+        print("batch  " + "".join(f"{name:>12}" for name in results))
+        for size in BATCH_SIZES:
+            print(f"{size:>5}  " + "".join(f"{results[name][size]:>12.1f}" for name in results))
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Cold-start import benchmark for the API and the Celery worker.
+
+Each target is imported in a fresh interpreter with `-X importtime`, the same way
+`uvicorn backend.api.main:app` and `celery -A backend.celery_app worker` load the code.
+The script reports wall time, the slowest modules, and whether torch was pulled in,
+and exits non-zero when a target exceeds its budget.
+
+Run from the repository root with the backend .env available:
+    python -m backend.benchmarks.import_time --api-budget 4 --worker-budget 4
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+TARGETS = {
+    # What uvicorn does when it loads the app
+    "api": "import backend.api.main",
+    # What the worker does at startup: load the app, then every module in `include`
+    "worker": "from backend.celery_app import celery; celery.loader.import_default_modules()",
+}
+
+PROBE = "; import sys; print('TORCH_LOADED=' + str('torch' in sys.modules))"
+
+def measure(statement: str, repo_root: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": repo_root}
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement + PROBE],
+        cwd=repo_root, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+
+    # -X importtime lines: "import time: self [us] | cumulative | imported package",
+    # with nested imports indented by two extra spaces per level
+    top_level = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2][1:] # Drop the separator's space; what remains is the nesting indent
+        if not name.startswith(" "):
+            top_level.append((int(parts[1]), name.strip()))
+    top_level.sort(reverse=True)
+
+    return {
+        "ok": result.returncode == 0,
+        "wall": wall,
+        "torch_loaded": "TORCH_LOADED=True" in result.stdout,
+        "slowest": top_level[:10],
+        "error": result.stderr.strip().splitlines()[-1] if result.returncode != 0 and result.stderr.strip() else "",
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-budget", type=float, default=float(os.getenv("API_IMPORT_BUDGET", 4.0)), help="Seconds")
+    parser.add_argument("--worker-budget", type=float, default=float(os.getenv("WORKER_IMPORT_BUDGET", 4.0)), help="Seconds")
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts per target; the median is reported")
+    args = parser.parse_args()
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    budgets = {"api": args.api_budget, "worker": args.worker_budget}
+    over_budget = False
+
+    for name, statement in TARGETS.items():
+        runs = [measure(statement, repo_root) for _ in range(max(1, args.runs))]
+        failed = [run for run in runs if not run["ok"]]
+        if failed:
+            print(f"[{name}] import failed: {failed[0]['error']}")
+            over_budget = True
+            continue
+
+        runs.sort(key=lambda run: run["wall"])
+        median = runs[len(runs) // 2]
+        status = "OK" if median["wall"] <= budgets[name] else "OVER BUDGET"
+        over_budget |= status != "OK"
+
+        print(f"\n[{name}] median cold import {median['wall']:.2f}s (budget {budgets[name]:.2f}s) -> {status}")
+        print(f"  torch imported at startup: {median['torch_loaded']}")
+        print("  slowest top-level imports (cumulative):")
+        for cumulative_us, module in median["slowest"]:
+            print(f"    {cumulative_us / 1e6:7.3f}s  {module}")
+
+    sys.exit(1 if over_budget else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Ingest pipeline benchmark against recorded scraper responses, with no network.
+
+Record the fixtures once (this calls the real APIs and spends quota):
+
+    python -m backend.benchmarks.offline_ingest --mode record --query "Continental GT 650" \\
+        --youtube-keywords exhaust vibration --subreddits motorcycles royalenfield
+
+then replay them as often as needed; every scraper call is served from the response cache
+(SCRAPER_CACHE_PATH) and a call that was never recorded returns nothing:
+
+    python -m backend.benchmarks.offline_ingest --query "Continental GT 650" \\
+        --youtube-keywords exhaust vibration --subreddits motorcycles royalenfield
+
+Use the same query, keywords and subreddits for both, since they make up the cache keys.
+Reports items/sec for the scrape, sentiment and embedding stages. Embedding bypasses the
+embedding cache so repeated runs measure the model. With --store PRODUCT_ID the items also go
+through process_and_store into Qdrant, which then has to be running.
+"""
+import os
+import time
+import argparse
+from types import SimpleNamespace
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", default="replay", choices=["record", "replay"])
+    parser.add_argument("--query", required=True)
+    parser.add_argument("--youtube-keywords", nargs="*", default=[])
+    parser.add_argument("--subreddits", nargs="*", default=[])
+    parser.add_argument("--store", type=int, metavar="PRODUCT_ID", help="Also upsert the items into Qdrant")
+    args = parser.parse_args()
+
+    # The cache mode is read when the scraper modules are first imported
+    os.environ["SCRAPER_CACHE_MODE"] = args.mode
+    from backend.pipeline.tasks import _build_scrape_jobs, stream_feedback, process_and_store
+    from backend.pipeline.sentiment import analyze_sentiment_batch
+    from backend.pipeline.embeddings import create_backend, encode_length_bucketed
+    from backend.scrapers.response_cache import response_cache_stats
+
+    config = SimpleNamespace(youtube_keywords=args.youtube_keywords, reddit_subreddits=args.subreddits)
+    jobs = _build_scrape_jobs(config, args.query)
+
+    started = time.perf_counter()
+    items = [item for item in stream_feedback(jobs) if item.get("content")]
+    scrape_seconds = time.perf_counter() - started
+    print(f"Response cache: {response_cache_stats()}")
+    if not items:
+        print("No items scraped. In replay mode, record with the same arguments first.")
+        return
+    if args.mode == "record":
+        print(f"Recorded responses for {len(items)} items.")
+
+    texts = [item["content"] for item in items]
+    started = time.perf_counter()
+    analyze_sentiment_batch(texts)
+    sentiment_seconds = time.perf_counter() - started
+
+    backend = create_backend()
+    started = time.perf_counter()
+    encode_length_bucketed(backend, texts)
+    embedding_seconds = time.perf_counter() - started
+
+    stages = [("scrape", scrape_seconds), ("sentiment", sentiment_seconds), ("embedding", embedding_seconds)]
+    if args.store is not None:
+        from backend.db.vector_store import QdrantDB
+        started = time.perf_counter()
+        process_and_store(items, args.store, QdrantDB())
+        stages.append(("process_and_store", time.perf_counter() - started))
+
+    print(f"{len(items)} items ({args.mode})")
+    print(f"  {'stage':<18} {'seconds':>8} {'items/sec':>10}")
+    for name, seconds in stages:
+        print(f"  {name:<18} {seconds:>8.2f} {len(items) / seconds if seconds else float('inf'):>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Bytes transferred per /ask retrieval, full payload versus the engine's projected fields.
+
+Sends the engine's product-filtered search (SEARCH_LIMIT hits) for each report question
+straight to Qdrant's REST API, once with `with_payload: true` and once with
+SEARCH_PAYLOAD_FIELDS, and reports response bytes and JSON decode time per query.
+
+    python -m backend.benchmarks.payload_projection --product-id 1
+"""
+import os
+import json
+import time
+import argparse
+import statistics
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+import httpx
+
+from backend.llm.engine import SEARCH_LIMIT, SEARCH_PAYLOAD_FIELDS
+from backend.pipeline.embeddings import get_query_embeddings
+from backend.reports.sections import REPORT_SECTIONS
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--product-id", type=int, required=True)
+    parser.add_argument("--collection", default="feedback_reviews")
+    parser.add_argument("--limit", type=int, default=SEARCH_LIMIT)
+    args = parser.parse_args()
+
+    qdrant_url = os.getenv("QDRANT_URL", "").rstrip("/")
+    qdrant_api_key = os.getenv("QDRANT_API_KEY")
+    if not qdrant_url or not qdrant_api_key:
+        raise ValueError("Qdrant environment variables are not set!")
+
+    vectors = [vector for vector in get_query_embeddings(list(REPORT_SECTIONS.values())) if vector]
+    variants = {"full payload": True, "projected": SEARCH_PAYLOAD_FIELDS}
+    results = {name: {"bytes": [], "decode_ms": [], "round_trip_ms": []} for name in variants}
+
+    with httpx.Client(headers={"api-key": qdrant_api_key}, timeout=60) as client:
+        for vector in vectors:
+            for name, with_payload in variants.items():
+                body = {
+                    "vector": vector,
+                    "filter": {"must": [{"key": "product_id", "match": {"value": args.product_id}}]},
+                    "limit": args.limit,
+                    "with_payload": with_payload,
+                }
+                started = time.perf_counter()
+                response = client.post(f"{qdrant_url}/collections/{args.collection}/points/search", json=body)
+                response.raise_for_status()
+                received = time.perf_counter()
+                json.loads(response.content)
+                decoded = time.perf_counter()
+                results[name]["bytes"].append(len(response.content))
+                results[name]["round_trip_ms"].append((received - started) * 1000)
+                results[name]["decode_ms"].append((decoded - received) * 1000)
+
+    print(f"{len(vectors)} queries, limit {args.limit}, projected fields: {', '.join(SEARCH_PAYLOAD_FIELDS)}")
+    print(f"  {'variant':<14} {'avg KB':>9} {'round trip ms':>14} {'decode ms':>10}")
+    for name, measured in results.items():
+        print(
+            f"  {name:<14} {statistics.mean(measured['bytes']) / 1024:>9.1f} "
+            f"{statistics.median(measured['round_trip_ms']):>14.1f} {statistics.median(measured['decode_ms']):>10.2f}"
+        )
+    full, projected = statistics.mean(results["full payload"]["bytes"]), statistics.mean(results["projected"]["bytes"])
+    if full:
+        print(f"Projection saves {(1 - projected / full) * 100:.1f}% of response bytes per /ask retrieval.")
+
+if __name__ == '__main__':
+    main()
@@ -25,6 +25,19 @@ celery.conf.update(
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
+    # Network-bound work (scraping, LLM calls, orchestration) goes to the "io" queue, served by
+    # a high-concurrency gevent worker; embedding and sentiment go to the "cpu" queue, served
+    # by a prefork worker with one process per core. See start_services.sh.
+    task_default_queue='io',
+    task_routes={
+        'backend.pipeline.tasks.embed_chunk_task': {'queue': 'cpu'},
+        'backend.pipeline.tasks.backfill_sentiment_task': {'queue': 'cpu'},
+    },
+    # Long tasks: take one message at a time and acknowledge it only when done, so a crashed
+    # worker's task is redelivered instead of lost
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
 )
 
 # Optional: Add simple task for testing worker connection
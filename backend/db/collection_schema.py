@@ -0,0 +1,137 @@
+import os
+import sys
+from qdrant_client import models
+
+# Bump SCHEMA_VERSION whenever the declaration below changes, so the migration log shows
+# which revision a collection was brought up to. The live collection config stays the
+# source of truth: `migrate` diffs it against the declaration and only applies differences.
+SCHEMA_VERSION = 2
+
+HNSW_M = int(os.getenv("QDRANT_HNSW_M", 16))
+HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", 128))
+SEARCH_HNSW_EF = int(os.getenv("QDRANT_SEARCH_HNSW_EF", 128)) # Query-time beam width
+VECTORS_ON_DISK = os.getenv("QDRANT_VECTORS_ON_DISK", "true").lower() == "true"
+QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "int8").lower() # int8 | none
+QUANTIZATION_QUANTILE = float(os.getenv("QDRANT_QUANTIZATION_QUANTILE", 0.99))
+RESCORE_OVERSAMPLING = float(os.getenv("QDRANT_RESCORE_OVERSAMPLING", 2.0))
+
+PAYLOAD_INDEXES = {
+    "product_id": models.PayloadSchemaType.INTEGER,
+    "source": models.PayloadSchemaType.KEYWORD,
+    "sentiment_label": models.PayloadSchemaType.KEYWORD,
+    "created_at": models.PayloadSchemaType.DATETIME,
+}
+
+def hnsw_config() -> models.HnswConfigDiff:
+    return models.HnswConfigDiff(m=HNSW_M, ef_construct=HNSW_EF_CONSTRUCT)
+
+def quantization_config():
+    """int8 scalar quantization kept in RAM; the full vectors can then live on disk for rescoring."""
+    if QUANTIZATION != "int8":
+        return None
+    return models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=QUANTIZATION_QUANTILE,
+            always_ram=True,
+        )
+    )
+
+def search_params() -> models.SearchParams:
+    """Query-time parameters matching the collection schema: search the quantized vectors,
+    then rescore an oversampled candidate set with the original vectors."""
+    quantization = None
+    if QUANTIZATION == "int8":
+        quantization = models.QuantizationSearchParams(rescore=True, oversampling=RESCORE_OVERSAMPLING)
+    return models.SearchParams(hnsw_ef=SEARCH_HNSW_EF, quantization=quantization)
+
+def create_collection(client, collection_name: str, dimension: int):
+    """Creates a collection with the current schema and all payload indexes."""
+    client.recreate_collection(
+        collection_name=collection_name,
+        vectors_config=models.VectorParams(
+            size=dimension,
+            distance=models.Distance.COSINE,
+            on_disk=VECTORS_ON_DISK,
+        ),
+        hnsw_config=hnsw_config(),
+        quantization_config=quantization_config(),
+    )
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema
+        )
+    print(f"Created collection '{collection_name}' with schema v{SCHEMA_VERSION}.")
+
+def _pending_changes(info) -> dict:
+    """What differs between a live collection (`get_collection` result) and the declared schema."""
+    params = info.config.params
+    changes = {}
+
+    hnsw = info.config.hnsw_config
+    if hnsw.m != HNSW_M or hnsw.ef_construct != HNSW_EF_CONSTRUCT:
+        changes["hnsw"] = f"m={hnsw.m}, ef_construct={hnsw.ef_construct} -> m={HNSW_M}, ef_construct={HNSW_EF_CONSTRUCT}"
+
+    on_disk = bool(getattr(params.vectors, "on_disk", False))
+    if on_disk != VECTORS_ON_DISK:
+        changes["on_disk"] = f"{on_disk} -> {VECTORS_ON_DISK}"
+
+    current = info.config.quantization_config
+    current_type = "int8" if isinstance(current, models.ScalarQuantization) else ("none" if current is None else type(current).__name__)
+    if current_type != QUANTIZATION:
+        changes["quantization"] = f"{current_type} -> {QUANTIZATION}"
+
+    existing_indexes = set((info.payload_schema or {}).keys())
+    missing = [field for field in PAYLOAD_INDEXES if field not in existing_indexes]
+    if missing:
+        changes["payload_indexes"] = missing
+    return changes
+
+def migrate(client, collection_name: str, dry_run: bool = False) -> dict:
+    """
+    Brings an existing collection up to the declared schema in place. Qdrant rebuilds the
+    HNSW graph and quantized vectors in the background, so search keeps working meanwhile.
+    Returns the changes found (applied unless dry_run).
+    """
+    changes = _pending_changes(client.get_collection(collection_name=collection_name))
+    if not changes:
+        print(f"Collection '{collection_name}' already matches schema v{SCHEMA_VERSION}.")
+        return changes
+
+    print(f"Collection '{collection_name}' differs from schema v{SCHEMA_VERSION}: {changes}")
+    if dry_run:
+        return changes
+
+    if {"hnsw", "on_disk", "quantization"} & changes.keys():
+        quantization = quantization_config() if QUANTIZATION == "int8" else models.Disabled.DISABLED
+        client.update_collection(
+            collection_name=collection_name,
+            vectors_config={"": models.VectorParamsDiff(on_disk=VECTORS_ON_DISK)} if "on_disk" in changes else None,
+            hnsw_config=hnsw_config() if "hnsw" in changes else None,
+            quantization_config=quantization if "quantization" in changes else None,
+        )
+    for field_name in changes.get("payload_indexes", []):
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=PAYLOAD_INDEXES[field_name]
+        )
+    print(f"Migrated '{collection_name}' to schema v{SCHEMA_VERSION}.")
+    return changes
+
+if __name__ == '__main__':
+    # Usage: python -m backend.db.collection_schema migrate [--dry-run] [<collection_name>]
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+    from backend.db.qdrant_pool import get_qdrant_client
+
+    args = sys.argv[1:]
+    if not args or args[0] != "migrate":
+        print("Usage: python -m backend.db.collection_schema migrate [--dry-run] [<collection_name>]")
+        sys.exit(1)
+    dry_run = "--dry-run" in args
+    names = [arg for arg in args[1:] if arg != "--dry-run"]
+    migrate(get_qdrant_client(), names[0] if names else "feedback_reviews", dry_run=dry_run)
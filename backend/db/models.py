@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -16,6 +16,8 @@ class Product(Base):
     owner_id = Column(String(255), ForeignKey('users.id'), nullable=False, index=True)
     owner = relationship("User", back_populates="products")
     config = relationship("ScraperConfig", uselist=False, back_populates="product", cascade="all, delete-orphan")
+    watermarks = relationship("IngestWatermark", back_populates="product", cascade="all, delete-orphan")
+    sentiment_stats = relationship("ProductSentimentStats", uselist=False, back_populates="product", cascade="all, delete-orphan")
 
 class ScraperConfig(Base):
     __tablename__ = 'scraper_configs'
@@ -24,4 +26,25 @@ class ScraperConfig(Base):
     search_query = Column(String(512))
     youtube_keywords = Column(JSON)
     reddit_subreddits = Column(JSON)
-    product = relationship("Product", back_populates="config")
\ No newline at end of file
+    product = relationship("Product", back_populates="config")
+
+class IngestWatermark(Base):
+    """Newest `created_at` already ingested for a product, per source (and per video/subreddit)."""
+    __tablename__ = 'ingest_watermarks'
+    __table_args__ = (UniqueConstraint('product_id', 'source_key', name='uq_watermark_product_source'),)
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), nullable=False, index=True)
+    source_key = Column(String(255), nullable=False)
+    watermark = Column(String(64), nullable=False)
+    product = relationship("Product", back_populates="watermarks")
+
+class ProductSentimentStats(Base):
+    """Whole-corpus sentiment counters for a product, updated as points are upserted."""
+    __tablename__ = 'product_sentiment_stats'
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    positive_count = Column(Integer, nullable=False, default=0)
+    negative_count = Column(Integer, nullable=False, default=0)
+    neutral_count = Column(Integer, nullable=False, default=0)
+    compound_sum = Column(Float, nullable=False, default=0.0)
+    source_counts = Column(JSON)
+    product = relationship("Product", back_populates="sentiment_stats")
\ No newline at end of file
@@ -0,0 +1,71 @@
+import os
+import threading
+
+# Every engine, vector store and task in a process shares one client, so HTTP connections
+# (or the gRPC channel) are kept alive across requests and tasks instead of reopened each time
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", 60))
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", 20)) # Keep-alive HTTP connections per client
+QDRANT_KEEPALIVE_EXPIRY = float(os.getenv("QDRANT_KEEPALIVE_EXPIRY", 30)) # Seconds an idle connection is kept
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+
+_clients = {}
+_clients_lock = threading.Lock()
+_initialized_collections = {}
+
+def _client_kwargs() -> dict:
+    qdrant_url = os.getenv("QDRANT_URL")
+    qdrant_api_key = os.getenv("QDRANT_API_KEY")
+    if not qdrant_url or not qdrant_api_key:
+        raise ValueError("Qdrant environment variables are not set!")
+
+    import httpx
+    return {
+        "url": qdrant_url,
+        "api_key": qdrant_api_key,
+        "timeout": QDRANT_TIMEOUT,
+        "prefer_grpc": QDRANT_PREFER_GRPC,
+        "grpc_port": QDRANT_GRPC_PORT,
+        # Forwarded to the underlying httpx client (REST transport only)
+        "limits": httpx.Limits(
+            max_connections=QDRANT_POOL_SIZE,
+            max_keepalive_connections=QDRANT_POOL_SIZE,
+            keepalive_expiry=QDRANT_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+def _get_client(kind: str):
+    # Keyed by pid: a client inherited across a fork (Celery prefork) shares the parent's sockets
+    key = (kind, os.getpid())
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                kwargs = _client_kwargs()
+                if kind == "async":
+                    from qdrant_client import AsyncQdrantClient
+                    client = AsyncQdrantClient(**kwargs)
+                else:
+                    from qdrant_client import QdrantClient
+                    client = QdrantClient(**kwargs)
+                transport = "gRPC" if QDRANT_PREFER_GRPC else f"HTTP, pool of {QDRANT_POOL_SIZE}"
+                print(f"Connected to Qdrant at {kwargs['url']} ({kind}, {transport})")
+                _clients[key] = client
+    return client
+
+def get_qdrant_client():
+    """Process-wide QdrantClient."""
+    return _get_client("sync")
+
+def get_async_qdrant_client():
+    """Process-wide AsyncQdrantClient, for use from the API's event loop."""
+    return _get_client("async")
+
+def get_initialized_collection(collection_name: str):
+    """The vector size recorded by mark_collection_initialized, or None if not checked yet."""
+    return _initialized_collections.get(collection_name)
+
+def mark_collection_initialized(collection_name: str, vector_dimension: int):
+    """Records that a collection exists, so later QdrantDB instances skip the get_collection call."""
+    _initialized_collections[collection_name] = vector_dimension
@@ -1,14 +1,36 @@
 import os
+import time
 import uuid
+import random
 from typing import List, Dict, Optional
-from qdrant_client import QdrantClient, models
-from ..pipeline.embeddings import get_embedding, model as embedding_model
+from qdrant_client import models
+from .collection_schema import create_collection
+from .qdrant_pool import get_qdrant_client, get_initialized_collection, mark_collection_initialized
+from ..pipeline.embeddings import get_embedding, encode_texts, EMBEDDING_DIMENSION
 
-dimension = embedding_model.get_sentence_embedding_dimension()
-if not isinstance(dimension, int):
-    raise ValueError("Could not determine the embedding dimension from the model.")
-VECTOR_DIMENSION: int = dimension
+# Taken from config so importing the vector store never loads the embedding model;
+# an existing collection's own vector size takes precedence (see _initialize_collection).
+VECTOR_DIMENSION: int = EMBEDDING_DIMENSION
 
+# Compact layout: empty fields are omitted and content_hash is shortened to 64 bits.
+# Switching it on makes the next incremental ingest see every hash as changed once.
+COMPACT_PAYLOAD = os.getenv("QDRANT_COMPACT_PAYLOAD", "false").lower() == "true"
+COMPACT_HASH_LENGTH = 16
+
+UPSERT_MAX_RETRIES = int(os.getenv("QDRANT_UPSERT_MAX_RETRIES", 4))
+UPSERT_RETRY_BACKOFF = float(os.getenv("QDRANT_UPSERT_RETRY_BACKOFF", 0.5)) # Seconds, doubled per attempt
+BARRIER_TIMEOUT = float(os.getenv("QDRANT_BARRIER_TIMEOUT", 120)) # Seconds wait_for_updates polls before failing
+BARRIER_POLL_INTERVAL = 0.5
+
+
+def compact_payload(payload: Dict) -> Dict:
+    """Applies the compact layout to a feedback payload when QDRANT_COMPACT_PAYLOAD is on."""
+    if not COMPACT_PAYLOAD:
+        return payload
+    compact = {key: value for key, value in payload.items() if value is not None and value != ""}
+    if compact.get("content_hash"):
+        compact["content_hash"] = compact["content_hash"][:COMPACT_HASH_LENGTH]
+    return compact
 
 def create_deterministic_id(source: str, external_id: str) -> str:
     id_string = f"{source}-{external_id}"
@@ -17,38 +39,99 @@ def create_deterministic_id(source: str, external_id: str) -> str:
 class QdrantDB:
     def __init__(self, collection_name: str = "feedback_reviews"):
         self.collection_name = collection_name
-        qdrant_url = os.getenv("QDRANT_URL")
-        qdrant_api_key = os.getenv("QDRANT_API_KEY")
-
-        if not qdrant_url or not qdrant_api_key:
-            raise ValueError("Qdrant environment variables are not set!")
-
-        self.client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key, timeout=60)
+        # Shared per process, so constructing a QdrantDB per task opens no new connection
+        self.client = get_qdrant_client()
         self._initialize_collection()
 
     def _initialize_collection(self):
+        cached_dimension = get_initialized_collection(self.collection_name)
+        if cached_dimension is not None:
+            self.vector_dimension = cached_dimension
+            return
+
+        self.vector_dimension = VECTOR_DIMENSION
         try:
-            self.client.get_collection(collection_name=self.collection_name)
+            info = self.client.get_collection(collection_name=self.collection_name)
+            vectors = info.config.params.vectors
+            size = getattr(vectors, "size", None)
+            if isinstance(size, int):
+                self.vector_dimension = size
+                if size != VECTOR_DIMENSION:
+                    print(f"WARNING: collection '{self.collection_name}' stores {size}-d vectors but EMBEDDING_DIMENSION is {VECTOR_DIMENSION}.")
         except Exception:
-            self.client.recreate_collection(
-                collection_name=self.collection_name,
-                vectors_config=models.VectorParams(
-                    size=VECTOR_DIMENSION,
-                    distance=models.Distance.COSINE
-                ),
-            )
-            # --- ADD THE NEW INDEX HERE ---
-            self.client.create_payload_index(
+            create_collection(self.client, self.collection_name, VECTOR_DIMENSION)
+        mark_collection_initialized(self.collection_name, self.vector_dimension)
+
+    def get_payloads(self, point_ids: List[str], fields: List[str]) -> Dict[str, Dict]:
+        """Bulk-fetches selected payload fields for the given point IDs (missing IDs are omitted)."""
+        if not point_ids:
+            return {}
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=point_ids,
+            with_payload=fields,
+            with_vectors=False
+        )
+        return {str(record.id): record.payload or {} for record in records}
+
+    def iter_product_payloads(self, product_id: int, fields: List[str], page_size: int = 1000):
+        """Yields pages of a product's points with the selected payload fields."""
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
                 collection_name=self.collection_name,
-                field_name="product_id",
-                field_schema=models.PayloadSchemaType.INTEGER
+                scroll_filter=models.Filter(must=[
+                    models.FieldCondition(key="product_id", match=models.MatchValue(value=product_id))
+                ]),
+                limit=page_size,
+                offset=offset,
+                with_payload=fields,
+                with_vectors=False
             )
-            # --- KEEP THE OLD INDEX AS WELL ---
-            self.client.create_payload_index(
+            if records:
+                yield records
+            if offset is None:
+                break
+
+    def iter_points_missing_sentiment(self, product_id: Optional[int] = None, page_size: int = 256):
+        """Yields pages of points (id, content, product_id) stored before sentiment was recorded at ingest."""
+        must = []
+        if product_id is not None:
+            must.append(models.FieldCondition(key="product_id", match=models.MatchValue(value=product_id)))
+        scroll_filter = models.Filter(
+            must=must,
+            should=[
+                models.IsEmptyCondition(is_empty=models.PayloadField(key="sentiment_label")),
+                models.IsEmptyCondition(is_empty=models.PayloadField(key="sentiment_compound")),
+            ]
+        )
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
                 collection_name=self.collection_name,
-                field_name="source",
-                field_schema=models.PayloadSchemaType.KEYWORD
+                scroll_filter=scroll_filter,
+                limit=page_size,
+                offset=offset,
+                with_payload=["content", "product_id"],
+                with_vectors=False
             )
+            if records:
+                yield records
+            if offset is None:
+                break
+
+    def set_payloads(self, updates: Dict[str, Dict]):
+        """Merges a different payload into each point ({point_id: fields}) in one request."""
+        if not updates:
+            return
+        self.client.batch_update_points(
+            collection_name=self.collection_name,
+            update_operations=[
+                models.SetPayloadOperation(set_payload=models.SetPayload(payload=fields, points=[point_id]))
+                for point_id, fields in updates.items()
+            ],
+            wait=True
+        )
 
     def upsert_feedback(self, item: Dict) -> Optional[str]:
         content = item.get("content")
@@ -71,9 +154,10 @@ class QdrantDB:
         )
         return point_id
 
-    def upsert_many_feedbacks(self, items: List[Dict]):
-        points_to_upsert = []
-        
+    def build_points(self, items: List[Dict]) -> List[models.PointStruct]:
+        """Embeds a batch of payloads and wraps them as PointStructs, without uploading them."""
+        points = []
+
         # 1. Separate content from payloads
         contents_to_embed = []
         valid_items = []
@@ -87,22 +171,68 @@ class QdrantDB:
                  print(f"Skipping feedback due to invalid content: ID {item.get('external_id')}")
 
         if not valid_items:
-            return # No valid items to process
-            
-        # 2. Embed all contents in a single, fast batch
+            return points # No valid items to process
+
+        # 2. Embed all contents in a single, fast batch (cached texts are not re-encoded)
         print(f"Generating {len(contents_to_embed)} embeddings...")
-        vectors = embedding_model.encode(contents_to_embed).tolist()
-        
+        vectors = encode_texts(contents_to_embed)
+
         # 3. Create PointStructs
         for item, vector in zip(valid_items, vectors):
             point_id = create_deterministic_id(item["source"], item["external_id"])
-            point = models.PointStruct(id=point_id, vector=vector, payload=item)
-            points_to_upsert.append(point)
-            
-        # 4. Upsert the batch to Qdrant
-        if points_to_upsert:
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=points_to_upsert,
-                wait=True
-            )
\ No newline at end of file
+            points.append(models.PointStruct(id=point_id, vector=vector, payload=item))
+        return points
+
+    def upsert_points(self, points: List[models.PointStruct], wait: bool = True):
+        """
+        Uploads prepared points, retrying failed requests with exponential backoff and jitter.
+        With wait=False Qdrant acknowledges the batch once it is queued rather than applied;
+        follow such uploads with wait_for_updates before relying on the data.
+        """
+        if not points:
+            return
+        for attempt in range(UPSERT_MAX_RETRIES + 1):
+            try:
+                self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=points,
+                    wait=wait
+                )
+                return
+            except Exception as e:
+                if attempt == UPSERT_MAX_RETRIES:
+                    raise
+                delay = UPSERT_RETRY_BACKOFF * (2 ** attempt) * (0.5 + random.random())
+                print(f"Upsert of {len(points)} points failed ({e}); retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+    def wait_for_updates(self, expected: Dict[str, Optional[str]], timeout: float = BARRIER_TIMEOUT):
+        """
+        Consistency barrier after wait=False uploads. `expected` maps every uploaded point id to
+        its payload's content_hash. Updates are only ordered within a shard, so rather than
+        trusting one point, this polls until every point is readable from all replicas with the
+        content it was uploaded with. Raises TimeoutError if that takes longer than `timeout`.
+        """
+        pending = dict(expected)
+        deadline = time.monotonic() + timeout
+        while pending:
+            ids = list(pending)
+            for start in range(0, len(ids), 1000):
+                records = self.client.retrieve(
+                    collection_name=self.collection_name,
+                    ids=ids[start:start + 1000],
+                    with_payload=["content_hash"],
+                    with_vectors=False,
+                    consistency=models.ReadConsistencyType.ALL
+                )
+                for record in records:
+                    if (record.payload or {}).get("content_hash") == pending.get(str(record.id)):
+                        pending.pop(str(record.id), None)
+            if not pending:
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{len(pending)} of {len(expected)} uploaded points not applied after {timeout:.0f}s.")
+            time.sleep(BARRIER_POLL_INTERVAL)
+
+    def upsert_many_feedbacks(self, items: List[Dict]):
+        self.upsert_points(self.build_points(items))
@@ -0,0 +1,113 @@
+import os
+import json
+import base64
+import time
+from array import array
+
+from backend.redis_client import get_redis
+from backend.pipeline.embeddings import get_query_embedding
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95)) # Min cosine similarity for a hit
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 24 * 3600)) # Seconds
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 200)) # Per product and corpus version
+REPLAY_CHUNK_CHARS = 64
+
+def _version_key(product_id: int) -> str:
+    return f"insightgenie:corpus_version:{product_id}"
+
+def _entries_key(product_id: int, version: int) -> str:
+    return f"insightgenie:answers:{product_id}:{version}"
+
+def get_corpus_version(product_id: int) -> int:
+    client = get_redis()
+    if client is None:
+        return 0
+    try:
+        value = client.get(_version_key(product_id))
+    except Exception as e:
+        print(f"Could not read corpus version for product {product_id}: {e}")
+        return 0
+    return int(value) if value else 0
+
+def bump_corpus_version(product_id: int):
+    """Called after an ingest changes a product's data; answers cached for older versions stop matching."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        version = client.incr(_version_key(product_id))
+        print(f"Corpus version for product {product_id} is now {version}.")
+    except Exception as e:
+        print(f"Could not bump corpus version for product {product_id}: {e}")
+
+def _encode_vector(vector: list) -> str:
+    return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+def _decode_vector(encoded: str) -> array:
+    return array("f", base64.b64decode(encoded))
+
+def lookup_answer(product_id: int, question: str, version: int | None = None):
+    """
+    Returns the cached answer for the most similar earlier question about the same corpus
+    version, if its cosine similarity is at least ANSWER_CACHE_THRESHOLD; otherwise None.
+    Entries older than ANSWER_CACHE_TTL are ignored even while newer ones keep the list alive.
+    """
+    client = get_redis()
+    if not ANSWER_CACHE_ENABLED or client is None:
+        return None
+    try:
+        query_vector = get_query_embedding(question)
+        if not query_vector:
+            return None
+        if version is None:
+            version = get_corpus_version(product_id)
+        entries = client.lrange(_entries_key(product_id, version), 0, -1)
+
+        best_score, best_entry = -1.0, None
+        oldest_allowed = time.time() - ANSWER_CACHE_TTL
+        for raw in entries:
+            entry = json.loads(raw)
+            if entry.get("created_at", 0) < oldest_allowed:
+                break # Newest first, so every later entry is older still
+            # Query embeddings are normalized, so the dot product is the cosine similarity
+            score = sum(a * b for a, b in zip(query_vector, _decode_vector(entry["vector"])))
+            if score > best_score:
+                best_score, best_entry = score, entry
+
+        if best_entry and best_score >= ANSWER_CACHE_THRESHOLD:
+            print(f"Answer cache hit for product {product_id} (similarity {best_score:.3f} to '{best_entry['question']}')")
+            return best_entry["answer"]
+    except Exception as e:
+        print(f"Answer cache lookup failed, answering without it: {e}")
+    return None
+
+def store_answer(product_id: int, question: str, answer: str, version: int | None = None):
+    """Caches a completed answer, keeping the newest ANSWER_CACHE_MAX_ENTRIES per corpus version."""
+    client = get_redis()
+    if not ANSWER_CACHE_ENABLED or client is None or not answer.strip():
+        return
+    try:
+        query_vector = get_query_embedding(question)
+        if not query_vector:
+            return
+        # Pass the version read before answering, so an ingest finishing mid-answer can't mislabel it
+        key = _entries_key(product_id, get_corpus_version(product_id) if version is None else version)
+        entry = json.dumps({
+            "question": question,
+            "vector": _encode_vector(query_vector),
+            "answer": answer,
+            "created_at": time.time(),
+        })
+        pipe = client.pipeline()
+        pipe.lpush(key, entry)
+        pipe.ltrim(key, 0, ANSWER_CACHE_MAX_ENTRIES - 1)
+        pipe.expire(key, ANSWER_CACHE_TTL)
+        pipe.execute()
+    except Exception as e:
+        print(f"Could not store answer in cache: {e}")
+
+def replay_answer(answer: str):
+    """Streams a cached answer in small chunks, like a live generation."""
+    for start in range(0, len(answer), REPLAY_CHUNK_CHARS):
+        yield answer[start:start + REPLAY_CHUNK_CHARS]
@@ -0,0 +1,107 @@
+import os
+
+from backend.pipeline.dedup import shingles
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 6000)) # Tokens of feedback per prompt
+CONTEXT_MAX_HIT_TOKENS = int(os.getenv("CONTEXT_MAX_HIT_TOKENS", 300)) # Longer hits are truncated
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", 0.8)) # Shingle Jaccard for near-duplicates
+CONTEXT_MMR = os.getenv("CONTEXT_MMR", "false").lower() == "true" # Needs the hits' vectors from the search
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", 0.7)) # 1.0 = pure relevance
+CHARS_PER_TOKEN = 4 # No tokenizer for the hosted LLM here; ~4 chars/token holds for English text
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def format_hit(payload: dict, max_tokens: int = CONTEXT_MAX_HIT_TOKENS) -> str:
+    """One context line: [sentiment] (rating★) "review text" - source (copies), with the text truncated."""
+    text = payload.get("content", "")
+    rating = payload.get("rating")
+    source = payload.get("source", "")
+    label = payload.get("sentiment_label", "neutral")
+    copies = payload.get("duplicate_count")
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit(" ", 1)[0] + "…"
+    rating_str = f"({rating}★)" if rating else ""
+    source_str = f" - {source}" if source else ""
+    copies_str = f" (posted {copies + 1} times)" if copies else ""
+    return f"[{label.upper()}] {rating_str} {text}{source_str}{copies_str}"
+
+def _is_near_duplicate(candidate: set, kept: list, threshold: float) -> bool:
+    for other in kept:
+        union = len(candidate | other)
+        if union and len(candidate & other) / union >= threshold:
+            return True
+    return False
+
+def _mmr_order(hits: list, lambda_: float) -> list:
+    """Reorders hits by maximal marginal relevance: each pick trades its query score against its
+    similarity to the hits already picked. Hits without vectors keep their relevance order."""
+    import numpy as np
+
+    with_vectors = [hit for hit in hits if getattr(hit, "vector", None)]
+    if len(with_vectors) < 2:
+        return hits
+    vectors = np.array([hit.vector for hit in with_vectors], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    similarity = vectors @ vectors.T
+    relevance = np.array([hit.score for hit in with_vectors], dtype=np.float32)
+
+    order = []
+    remaining = list(range(len(with_vectors)))
+    max_sim = np.full(len(with_vectors), -np.inf, dtype=np.float32)
+    while remaining:
+        redundancy = np.where(np.isfinite(max_sim[remaining]), max_sim[remaining], 0.0)
+        scores = lambda_ * relevance[remaining] - (1 - lambda_) * redundancy
+        pick = remaining.pop(int(np.argmax(scores)))
+        order.append(pick)
+        max_sim = np.maximum(max_sim, similarity[pick])
+    return [with_vectors[i] for i in order] + [hit for hit in hits if not getattr(hit, "vector", None)]
+
+def pack_context(search_results: list, token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 mmr: bool = CONTEXT_MMR, dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD):
+    """
+    Chooses which hits go into the prompt: near-duplicates (normalized-text shingle overlap of at
+    least `dedup_threshold`) are dropped, each hit is capped at CONTEXT_MAX_HIT_TOKENS, and lines
+    are added in relevance order (or MMR order) until `token_budget` is spent.
+    Returns (lines, report) where report counts tokens used and dropped.
+    """
+    hits = _mmr_order(search_results, CONTEXT_MMR_LAMBDA) if mmr else list(search_results)
+    lines, kept_shingles = [], []
+    report = {"hits": len(search_results), "used": 0, "used_tokens": 0, "duplicates": 0,
+              "duplicate_tokens": 0, "over_budget": 0, "over_budget_tokens": 0, "truncated_tokens": 0}
+
+    for hit in hits:
+        payload = getattr(hit, "payload", None) or {}
+        text = payload.get("content", "")
+        if not text:
+            continue
+        full_tokens = estimate_tokens(text)
+
+        hit_shingles = shingles(text)
+        if _is_near_duplicate(hit_shingles, kept_shingles, dedup_threshold):
+            report["duplicates"] += 1
+            report["duplicate_tokens"] += full_tokens
+            continue
+
+        line = format_hit(payload)
+        line_tokens = estimate_tokens(line)
+        if report["used_tokens"] + line_tokens > token_budget:
+            # Keep scanning: a shorter, less relevant hit may still fit
+            report["over_budget"] += 1
+            report["over_budget_tokens"] += line_tokens
+            continue
+
+        lines.append(line)
+        kept_shingles.append(hit_shingles)
+        report["used"] += 1
+        report["used_tokens"] += line_tokens
+        report["truncated_tokens"] += max(0, full_tokens - CONTEXT_MAX_HIT_TOKENS)
+
+    dropped = report["duplicate_tokens"] + report["over_budget_tokens"] + report["truncated_tokens"]
+    print(
+        f"Context: {report['used']}/{report['hits']} hits, ~{report['used_tokens']} tokens used, "
+        f"~{dropped} dropped ({report['duplicates']} near-duplicates, {report['over_budget']} over the "
+        f"{token_budget}-token budget, {report['truncated_tokens']} truncated)."
+    )
+    return lines, report
@@ -1,29 +1,29 @@
 import os
+import time
+import asyncio
 import traceback
 from collections import Counter
-from huggingface_hub import InferenceClient
-from qdrant_client import QdrantClient, models
-from backend.pipeline.sentiment import analyze_sentiment
-from backend.pipeline.embeddings import get_embedding
+from concurrent.futures import ThreadPoolExecutor
+from qdrant_client import models
+from backend.db.collection_schema import search_params
+from backend.llm.context import pack_context, CONTEXT_MMR
+from backend.db.qdrant_pool import get_qdrant_client, get_async_qdrant_client
+from backend.pipeline.embeddings import get_query_embedding, get_query_embeddings, aget_query_embedding
+
+SEARCH_LIMIT = 100
+# The only payload fields prompts and stats read; the rest of the payload stays on the server
+SEARCH_PAYLOAD_FIELDS = ["content", "source", "rating", "sentiment_label", "duplicate_count"]
+REPORT_MAX_CONCURRENCY = int(os.getenv("REPORT_MAX_CONCURRENCY", 4)) # Concurrent LLM generations per report
+NO_RESULTS_MESSAGE = "## Analysis Result\n\n No relevant user feedback was found for this product in the database.\n\nPlease ensure reviews have been scraped and indexed for this product."
 
 class InsightEngine:
     def __init__(self):
-        qdrant_url = os.getenv("QDRANT_URL")
-        qdrant_api_key = os.getenv("QDRANT_API_KEY")
         self.collection_name = "feedback_reviews"
-
-        if qdrant_url and qdrant_api_key:
-            self.qdrant_client = QdrantClient(
-                url=qdrant_url,
-                api_key=qdrant_api_key,
-                timeout=60
-            )
-            print(f"Connected to Qdrant Cloud at {qdrant_url}")
-        else:
-            raise ValueError("Qdrant Cloud env vars missing!")
+        self.qdrant_client = get_qdrant_client()
 
         hf_token = os.getenv("HF_TOKEN")
         if hf_token:
+            from huggingface_hub import InferenceClient # Deferred: only processes that answer questions need it
             self.llm_client = InferenceClient(provider="fireworks-ai", api_key=hf_token)
             self.model = "openai/gpt-oss-120b" 
             print(f"Using LLM model via Fireworks AI: {self.model}")
@@ -62,7 +62,88 @@ class InsightEngine:
         
         return sentiment_breakdown, rating_breakdown
 
-    def answer_question(self, question: str, product_id: int, product_name: str | None = None):
+    def _product_filter(self, product_id: int):
+        return models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="product_id",
+                    match=models.MatchValue(value=product_id)
+                )
+            ]
+        )
+
+    def _build_prompts(self, question: str, product_id: int, product_name: str | None, search_results, corpus_stats: dict | None = None):
+        """Turns search hits into the (system_prompt, user_prompt, context_text) sent to the LLM."""
+        # Calculate sentiment statistics
+        sentiment_breakdown, rating_breakdown = self._calculate_sentiment_stats(search_results)
+        sentiment_scope = f"top {len(search_results)} retrieved reviews"
+        if corpus_stats and corpus_stats.get("total"):
+            sentiment_breakdown = corpus_stats["sentiment_breakdown"]
+            sentiment_scope = f"all {corpus_stats['total']} stored reviews"
+
+        # Enrich context with the sentiment labels stored at ingest time, within the token budget
+        enriched_context, _ = pack_context(search_results)
+        context_text = "\n".join(enriched_context)
+
+        # Enhanced system prompt with STRICT product-only focus
+        system_prompt = """You are a helpful product analyst assistant for InsightGenie. 
+Your task is to analyze customer feedback context provided and answer the user's specific question accurately and concisely based ONLY on that context.
+
+**CRITICAL RULES:**
+1.  **Focus ONLY on the PRODUCT:** Ignore any comments about videos, reviews, reviewers, channels, or production quality. Analyze only feedback related to the product itself (features, performance, quality, user experience).
+2.  **Use the Provided Context:** Base your answer strictly on the customer feedback provided in the 'Context' section of the user prompt. Do not add outside information or opinions.
+3.  **Answer the Specific Question:** Directly address the user's question. If the question asks for Pros, list only pros. If it asks for Cons, list only cons. If it asks for an overall summary, provide only that.
+4.  **Be Clear and Concise:** Use clear language. Use bullet points for lists where appropriate (like for Pros, Cons, or Feature Requests)."""
+
+        user_prompt = f"""
+**User's Question:**
+{question}
+
+**Product Name:**
+{product_name if product_name else f"Product ID: {product_id}"}
+
+**Customer Feedback Context (Total: {len(enriched_context)} reviews):**
+---
+{context_text}
+---
+
+**Pre-calculated Statistics:**
+- Sentiment Breakdown ({sentiment_scope}): {sentiment_breakdown}
+- Rating Distribution: {rating_breakdown if rating_breakdown else "Not available"}
+
+**Reminder:** Analyze ONLY the product itself based on the context provided. Answer only the specific question asked above.
+
+Your Answer:"""
+        return system_prompt, user_prompt, context_text
+
+    def _completion_request(self, system_prompt: str, user_prompt: str) -> dict:
+        return dict(
+            model=self.model, 
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            max_tokens=1000, # Can reduce this slightly now
+            temperature=0.3, # Lower temp for more factual answers
+            stream=True
+        )
+
+    def _stream_completion(self, system_prompt: str, user_prompt: str, timings: dict | None = None):
+        """Yields the LLM answer chunk by chunk, recording time-to-first-token in `timings`."""
+        timings = timings if timings is not None else {}
+        step_start = time.perf_counter()
+        stream = self.llm_client.chat.completions.create(**self._completion_request(system_prompt, user_prompt))
+        print("STEP 3: Stream from LLM received. Yielding content...")
+
+        for chunk in stream:
+            content = chunk.choices[0].delta.content
+            if content:
+                if "llm_first_token" not in timings:
+                    timings["llm_first_token"] = time.perf_counter() - step_start
+                yield content
+        timings["llm_total"] = time.perf_counter() - step_start
+
+    def answer_question(self, question: str, product_id: int, product_name: str | None = None, corpus_stats: dict | None = None, on_complete=None):
         """
         Generate insights based on user question and product reviews
         
@@ -70,7 +151,12 @@ class InsightEngine:
             question: User's query about the product
             product_id: ID of the product to analyze
             product_name: Name of the product (optional, for better formatting)
+            corpus_stats: Whole-corpus aggregates from get_product_stats (optional); when given,
+                the sentiment breakdown covers every stored review, not just the retrieved ones
+            on_complete: Called with the full answer text once the LLM stream finishes successfully
         """
+        timings = {}
+        started = time.perf_counter()
         try:
             print("--- Insight Engine Started ---")
             if not self.llm_client:
@@ -78,107 +164,50 @@ class InsightEngine:
                 return
 
             print(f"STEP 1: Processing query: '{question}'")
-            query_vector = get_embedding(question)
+            step_start = time.perf_counter()
+            query_vector = get_query_embedding(question)
+            timings["embed"] = time.perf_counter() - step_start
             if not query_vector:
                 yield "Error: Could not process the query into an embedding."
                 return
             print("STEP 1: Query processed successfully.")
 
             print(f"STEP 2: Searching Qdrant for product_id {product_id}...")
+            step_start = time.perf_counter()
             search_results = self.qdrant_client.search(
                 collection_name=self.collection_name,
                 query_vector=query_vector,
-                query_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="product_id",
-                            match=models.MatchValue(value=product_id)
-                        )
-                    ]
-                ),
-                limit=100, 
-                with_payload=True
+                query_filter=self._product_filter(product_id),
+                search_params=search_params(),
+                limit=SEARCH_LIMIT,
+                with_payload=SEARCH_PAYLOAD_FIELDS,
+                with_vectors=CONTEXT_MMR # MMR reranks by the hits' own vectors
             )
+            timings["search"] = time.perf_counter() - step_start
             print("STEP 2: Qdrant search complete.")
 
             if not search_results:
-                yield "## Analysis Result\n\n No relevant user feedback was found for this product in the database.\n\nPlease ensure reviews have been scraped and indexed for this product."
+                yield NO_RESULTS_MESSAGE
                 return
 
             print(f"Found {len(search_results)} relevant comments.")
-            
-            # Calculate sentiment statistics
-            sentiment_breakdown, rating_breakdown = self._calculate_sentiment_stats(search_results)
-            
-            # Enrich context with sentiment labels
-            enriched_context = []
-            for result in search_results:
-                payload = getattr(result, "payload", None) or {}
-                text = payload.get("content", "")
-                rating = payload.get("rating")
-                source = payload.get("source", "")
-                label = payload.get("sentiment_label", "neutral")
-                if text:
-                    sentiment = analyze_sentiment(text) or {}
-                    label = sentiment.get("label", "neutral")
-                    
-                    # Format: [sentiment] (rating★) "review text" - source
-                    rating_str = f"({rating}★)" if rating else ""
-                    source_str = f" - {source}" if source else ""
-                    enriched_context.append(f"[{label.upper()}] {rating_str} {text}{source_str}")
-            
-            context_text = "\n".join(enriched_context)
-            
-            # Enhanced system prompt with STRICT product-only focus
-            system_prompt = """You are a helpful product analyst assistant for InsightGenie. 
-Your task is to analyze customer feedback context provided and answer the user's specific question accurately and concisely based ONLY on that context.
-
-**CRITICAL RULES:**
-1.  **Focus ONLY on the PRODUCT:** Ignore any comments about videos, reviews, reviewers, channels, or production quality. Analyze only feedback related to the product itself (features, performance, quality, user experience).
-2.  **Use the Provided Context:** Base your answer strictly on the customer feedback provided in the 'Context' section of the user prompt. Do not add outside information or opinions.
-3.  **Answer the Specific Question:** Directly address the user's question. If the question asks for Pros, list only pros. If it asks for Cons, list only cons. If it asks for an overall summary, provide only that.
-4.  **Be Clear and Concise:** Use clear language. Use bullet points for lists where appropriate (like for Pros, Cons, or Feature Requests)."""
-
-            user_prompt = f"""
-**User's Question:**
-{question}
-
-**Product Name:**
-{product_name if product_name else f"Product ID: {product_id}"}
 
-**Customer Feedback Context (Total: {len(search_results)} reviews):**
----
-{context_text}
----
-
-**Pre-calculated Statistics:**
-- Sentiment Breakdown: {sentiment_breakdown}
-- Rating Distribution: {rating_breakdown if rating_breakdown else "Not available"}
-
-**Reminder:** Analyze ONLY the product itself based on the context provided. Answer only the specific question asked above.
-
-Your Answer:"""
+            step_start = time.perf_counter()
+            system_prompt, user_prompt, context_text = self._build_prompts(
+                question, product_id, product_name, search_results, corpus_stats
+            )
+            timings["context"] = time.perf_counter() - step_start
 
             print(f"\n--- CONTEXT FOR '{question}' ---")
             print(context_text)
             print("--- END CONTEXT ---\n")
             print(f"STEP 3: Generating analysis with {self.model} via Fireworks AI...")
-            stream = self.llm_client.chat.completions.create(
-                model=self.model, 
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=1000, # Can reduce this slightly now
-                temperature=0.3, # Lower temp for more factual answers
-                stream=True
-            )
-            print("STEP 3: Stream from LLM received. Yielding content...")
-
-            for chunk in stream:
-                content = chunk.choices[0].delta.content
-                if content:
-                    yield content
+            chunks = []
+            for content in self._stream_completion(system_prompt, user_prompt, timings):
+                chunks.append(content)
+                yield content
+            if on_complete:
+                on_complete("".join(chunks))
 
             print("\n--- Insight Engine Finished ---")
 
@@ -186,6 +215,67 @@ Your Answer:"""
             print(f"An error occurred while generating the analysis: {e}")
             traceback.print_exc()
             yield f"\n\n** An error occurred:** {e}\n\nPlease check your configuration and try again."
+        finally:
+            timings["total"] = time.perf_counter() - started
+            print("Timing breakdown (ms): " + ", ".join(f"{step}={seconds * 1000:.1f}" for step, seconds in timings.items()))
+
+    def answer_questions(self, questions: list, product_id: int, product_name: str | None = None,
+                         corpus_stats: dict | None = None, max_concurrency: int = REPORT_MAX_CONCURRENCY) -> list:
+        """
+        Answers several questions about one product, returning full answers in input order.
+        All questions are embedded in one batch and retrieved in one `search_batch` round trip;
+        the LLM generations then run concurrently, at most `max_concurrency` at a time.
+        """
+        print(f"--- Insight Engine: answering {len(questions)} questions for product_id {product_id} ---")
+        started = time.perf_counter()
+
+        query_vectors = get_query_embeddings(questions)
+        embedded_at = time.perf_counter()
+
+        requests = [
+            models.SearchRequest(
+                vector=vector,
+                filter=self._product_filter(product_id),
+                params=search_params(),
+                limit=SEARCH_LIMIT,
+                with_payload=SEARCH_PAYLOAD_FIELDS,
+                with_vector=CONTEXT_MMR
+            )
+            for vector in query_vectors if vector
+        ]
+        batch_results = iter(self.qdrant_client.search_batch(
+            collection_name=self.collection_name,
+            requests=requests
+        ) if requests else [])
+        results_per_question = [next(batch_results) if vector else None for vector in query_vectors]
+        searched_at = time.perf_counter()
+        print(f"Batched retrieval done: embed={(embedded_at - started) * 1000:.1f}ms, search={(searched_at - embedded_at) * 1000:.1f}ms")
+
+        def answer(index: int) -> str:
+            question = questions[index]
+            search_results = results_per_question[index]
+            if search_results is None:
+                return "Error: Could not process the query into an embedding."
+            if not search_results:
+                return NO_RESULTS_MESSAGE
+            try:
+                system_prompt, user_prompt, _ = self._build_prompts(
+                    question, product_id, product_name, search_results, corpus_stats
+                )
+                timings = {}
+                answer_text = "".join(self._stream_completion(system_prompt, user_prompt, timings))
+                print(f"Answered question {index + 1}/{len(questions)} (LLM total {timings.get('llm_total', 0) * 1000:.1f}ms)")
+                return answer_text
+            except Exception as e:
+                print(f"An error occurred while generating the analysis: {e}")
+                traceback.print_exc()
+                return f"\n\n** An error occurred:** {e}\n\nPlease check your configuration and try again."
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(questions) or 1)), thread_name_prefix="llm") as executor:
+            answers = list(executor.map(answer, range(len(questions))))
+
+        print(f"--- Insight Engine: {len(questions)} answers in {(time.perf_counter() - started) * 1000:.1f}ms ---")
+        return answers
 
     def generate_report(self, product_id: int, product_name: str, time_period: str = "weekly"):
        
@@ -200,4 +290,89 @@ Your Answer:"""
         
         # Stream the main analysis
         for chunk in self.answer_question(question, product_id, product_name):
-            yield chunk
\ No newline at end of file
+            yield chunk
+
+
+class AsyncInsightEngine(InsightEngine):
+    """
+    Non-blocking variant of InsightEngine for the API: Qdrant is queried through
+    AsyncQdrantClient and the LLM is streamed through AsyncInferenceClient, so an in-flight
+    question holds no threadpool thread while it waits on the network. Prompt building is
+    shared with the synchronous engine.
+    """
+
+    def __init__(self):
+        self.collection_name = "feedback_reviews"
+        self.qdrant_client = get_async_qdrant_client()
+
+        hf_token = os.getenv("HF_TOKEN")
+        if hf_token:
+            from huggingface_hub import AsyncInferenceClient
+            self.llm_client = AsyncInferenceClient(provider="fireworks-ai", api_key=hf_token)
+            self.model = "openai/gpt-oss-120b"
+            print(f"Using async LLM model via Fireworks AI: {self.model}")
+        else:
+            raise ValueError("HF_TOKEN environment variable is not set!")
+
+    async def answer_question(self, question: str, product_id: int, product_name: str | None = None, corpus_stats: dict | None = None, on_complete=None):
+        """Async generator with the same arguments and output as InsightEngine.answer_question."""
+        timings = {}
+        started = time.perf_counter()
+        try:
+            print("--- Async Insight Engine Started ---")
+            step_start = time.perf_counter()
+            query_vector = await aget_query_embedding(question)
+            timings["embed"] = time.perf_counter() - step_start
+            if not query_vector:
+                yield "Error: Could not process the query into an embedding."
+                return
+
+            step_start = time.perf_counter()
+            search_results = await self.qdrant_client.search(
+                collection_name=self.collection_name,
+                query_vector=query_vector,
+                query_filter=self._product_filter(product_id),
+                search_params=search_params(),
+                limit=SEARCH_LIMIT,
+                with_payload=SEARCH_PAYLOAD_FIELDS,
+                with_vectors=CONTEXT_MMR
+            )
+            timings["search"] = time.perf_counter() - step_start
+
+            if not search_results:
+                yield NO_RESULTS_MESSAGE
+                return
+
+            print(f"Found {len(search_results)} relevant comments.")
+
+            step_start = time.perf_counter()
+            system_prompt, user_prompt, _ = self._build_prompts(
+                question, product_id, product_name, search_results, corpus_stats
+            )
+            timings["context"] = time.perf_counter() - step_start
+
+            step_start = time.perf_counter()
+            stream = await self.llm_client.chat.completions.create(**self._completion_request(system_prompt, user_prompt))
+            chunks = []
+            async for chunk in stream:
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    if "llm_first_token" not in timings:
+                        timings["llm_first_token"] = time.perf_counter() - step_start
+                    chunks.append(content)
+                    yield content
+            timings["llm_total"] = time.perf_counter() - step_start
+
+            if on_complete:
+                # Callbacks (e.g. caching the answer) do blocking I/O, so keep them off the event loop
+                await asyncio.to_thread(on_complete, "".join(chunks))
+
+            print("\n--- Async Insight Engine Finished ---")
+
+        except Exception as e:
+            print(f"An error occurred while generating the analysis: {e}")
+            traceback.print_exc()
+            yield f"\n\n** An error occurred:** {e}\n\nPlease check your configuration and try again."
+        finally:
+            timings["total"] = time.perf_counter() - started
+            print("Timing breakdown (ms): " + ", ".join(f"{step}={seconds * 1000:.1f}" for step, seconds in timings.items()))
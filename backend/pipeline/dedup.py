@@ -0,0 +1,190 @@
+import os
+import re
+import random
+import hashlib
+from array import array
+
+from backend.redis_client import get_redis
+from backend.pipeline.embedding_cache import normalize_text
+
+DEDUP_ENABLED = os.getenv("INGEST_DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("INGEST_DEDUP_THRESHOLD", 0.8)) # Estimated Jaccard to count as a copy
+DEDUP_MIN_WORDS = int(os.getenv("INGEST_DEDUP_MIN_WORDS", 5)) # Short texts ("great!") are legitimately repeated
+NUM_PERM = 64
+BANDS = 8 # 8 bands x 8 rows: pairs above ~0.77 Jaccard share a band with high probability
+ROWS = NUM_PERM // BANDS
+DEDUP_LOCK_TIMEOUT = float(os.getenv("INGEST_DEDUP_LOCK_TIMEOUT", 60)) # Seconds a batch may hold or wait for the lock
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1729) # Fixed seed: signatures persisted in Redis must stay comparable across runs
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_WORD = re.compile(r"\w+")
+
+def _band_key(product_id: int) -> str:
+    return f"insightgenie:lsh:{product_id}" # "band:digest" -> canonical point id
+
+def _signature_key(product_id: int) -> str:
+    return f"insightgenie:minhash:{product_id}" # canonical point id -> packed signature
+
+def _duplicate_of_key(product_id: int) -> str:
+    return f"insightgenie:duplicate_of:{product_id}" # duplicate point id -> canonical point id
+
+def _lock_key(product_id: int) -> str:
+    return f"insightgenie:dedup_lock:{product_id}"
+
+def _count_key(product_id: int) -> str:
+    return f"insightgenie:duplicate_count:{product_id}" # canonical point id -> copies folded into it
+
+def shingles(text: str) -> set:
+    """Word 3-grams of the normalized text (the whole text when shorter)."""
+    words = _WORD.findall(normalize_text(text))
+    if len(words) < 3:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+def minhash_signature(text: str) -> array:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles(text)]
+    return array("I", [
+        min((a * h + b) % _PRIME for h in hashes) & 0xFFFFFFFF
+        for a, b in _PERMUTATIONS
+    ])
+
+def _bands(signature: array) -> list:
+    return [
+        f"{band}:{hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).hexdigest()}"
+        for band in range(BANDS)
+    ]
+
+def _similarity(a: array, b: array) -> float:
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+def fold_near_duplicates(product_id: int, candidates: dict):
+    """
+    Drops near-copies of content already stored for the product (or earlier in `candidates`)
+    and counts them against the first copy seen, the canonical point.
+
+    `candidates` maps point id -> payload. The product's LSH index lives in Redis, so copies
+    are recognized across ingests; batches of one product are checked one at a time under a
+    Redis lock. Returns (kept, canonical_counts, indexed): the payloads to store, each
+    with `duplicate_count` set when copies were folded into it, {canonical point id:
+    duplicate_count} for canonicals stored by earlier batches, whose payloads need updating,
+    and what was added to the index, for unfold_near_duplicates if the batch is never stored.
+    """
+    client = get_redis()
+    indexed = {"canonicals": {}, "duplicates": {}}
+    if not DEDUP_ENABLED or client is None or not candidates:
+        return candidates, {}, indexed
+    try:
+        signatures, bands = {}, {}
+        for point_id, payload in candidates.items():
+            if len(_WORD.findall(payload.get("content", ""))) >= DEDUP_MIN_WORDS:
+                signatures[point_id] = minhash_signature(payload["content"])
+                bands[point_id] = _bands(signatures[point_id])
+        if not signatures:
+            return candidates, {}, indexed
+
+        # Lookup and insert must be atomic per product: two batches checked concurrently would
+        # each miss the other's copy and both store a canonical point
+        with client.lock(_lock_key(product_id), timeout=DEDUP_LOCK_TIMEOUT, blocking_timeout=DEDUP_LOCK_TIMEOUT):
+            # Round trip 1: band buckets and earlier verdicts for every candidate
+            ids = list(signatures)
+            pipe = client.pipeline()
+            for point_id in ids:
+                pipe.hmget(_band_key(product_id), bands[point_id])
+            pipe.hmget(_duplicate_of_key(product_id), ids)
+            *bucket_hits, known_duplicate_of = pipe.execute()
+
+            stored_candidates = {
+                point_id: {hit.decode() for hit in hits if hit}
+                for point_id, hits in zip(ids, bucket_hits)
+            }
+            # Round trip 2: signatures of the stored canonicals those buckets point to
+            lookup = sorted(set().union(*stored_candidates.values()))
+            stored_signatures = {}
+            if lookup:
+                for canonical, packed in zip(lookup, client.hmget(_signature_key(product_id), lookup)):
+                    if packed:
+                        stored_signatures[canonical] = array("I", packed)
+
+            local_buckets = {} # Band -> canonical kept earlier in this batch
+            new_canonicals, new_duplicates, repeat_duplicates = [], {}, set()
+            for point_id, duplicate_of in zip(ids, known_duplicate_of):
+                if duplicate_of:
+                    repeat_duplicates.add(point_id) # Folded by an earlier ingest; already counted
+                    continue
+                if point_id in stored_candidates[point_id]:
+                    continue # Already stored as a canonical: it is re-stored as usual
+
+                options = {**{c: stored_signatures[c] for c in stored_candidates[point_id] if c in stored_signatures},
+                           **{local_buckets[band]: signatures[local_buckets[band]] for band in bands[point_id] if band in local_buckets}}
+                best, best_score = None, 0.0
+                for canonical, signature in options.items():
+                    score = _similarity(signatures[point_id], signature)
+                    if score > best_score:
+                        best, best_score = canonical, score
+
+                if best is not None and best_score >= DEDUP_THRESHOLD:
+                    new_duplicates[point_id] = best
+                else:
+                    new_canonicals.append(point_id)
+                    for band in bands[point_id]:
+                        local_buckets.setdefault(band, point_id)
+
+            # Round trip 3: record new canonicals and duplicates, then read back the counts
+            pipe = client.pipeline()
+            for point_id in new_canonicals:
+                for band in bands[point_id]:
+                    pipe.hsetnx(_band_key(product_id), band, point_id)
+                pipe.hset(_signature_key(product_id), point_id, signatures[point_id].tobytes())
+            for point_id, canonical in new_duplicates.items():
+                pipe.hset(_duplicate_of_key(product_id), point_id, canonical)
+                pipe.hincrby(_count_key(product_id), canonical, 1)
+            kept = {point_id: payload for point_id, payload in candidates.items()
+                    if point_id not in new_duplicates and point_id not in repeat_duplicates}
+            touched = sorted(set(new_duplicates.values()) | set(kept))
+            if touched: # HMGET takes at least one field; empty when every candidate was a known copy
+                pipe.hmget(_count_key(product_id), touched)
+            results = pipe.execute()
+            counts = {point_id: int(count) for point_id, count in zip(touched, results[-1]) if count} if touched else {}
+            indexed = {"canonicals": {point_id: bands[point_id] for point_id in new_canonicals},
+                       "duplicates": dict(new_duplicates)}
+    except Exception as e:
+        print(f"Near-duplicate detection failed, storing the batch as is: {e}")
+        return candidates, {}, indexed
+
+    for point_id, payload in kept.items():
+        if point_id in counts:
+            payload["duplicate_count"] = counts[point_id]
+    dropped = len(new_duplicates) + len(repeat_duplicates)
+    if dropped:
+        print(f"Dropped {dropped} near-duplicate items ({len(new_duplicates)} newly folded into canonical points).")
+    return kept, {point_id: count for point_id, count in counts.items() if point_id not in kept}, indexed
+
+def unfold_near_duplicates(product_id: int, indexed: dict):
+    """
+    Removes what fold_near_duplicates added to the index for a batch whose points never reached
+    Qdrant, so later copies are not folded into canonical points that don't exist.
+    """
+    client = get_redis()
+    if client is None or not (indexed["canonicals"] or indexed["duplicates"]):
+        return
+    try:
+        with client.lock(_lock_key(product_id), timeout=DEDUP_LOCK_TIMEOUT, blocking_timeout=DEDUP_LOCK_TIMEOUT):
+            canonicals = indexed["canonicals"]
+            owners = {}
+            if canonicals:
+                all_bands = sorted(set().union(*map(set, canonicals.values())))
+                owners = dict(zip(all_bands, client.hmget(_band_key(product_id), all_bands)))
+            pipe = client.pipeline()
+            for point_id, point_bands in canonicals.items():
+                # Only buckets this point claimed; HSETNX may have left others to an older canonical
+                owned = [band for band in point_bands if owners.get(band) and owners[band].decode() == point_id]
+                if owned:
+                    pipe.hdel(_band_key(product_id), *owned)
+                pipe.hdel(_signature_key(product_id), point_id)
+            for point_id, canonical in indexed["duplicates"].items():
+                pipe.hdel(_duplicate_of_key(product_id), point_id)
+                pipe.hincrby(_count_key(product_id), canonical, -1)
+            pipe.execute()
+    except Exception as e:
+        print(f"Could not roll back near-duplicate index entries for product {product_id}: {e}")
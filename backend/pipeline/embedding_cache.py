@@ -0,0 +1,167 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), '..', '.cache', 'embeddings.sqlite3')
+)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 500_000)) # On-disk rows
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", 10_000)) # In-memory LRU
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+
+def normalize_text(text: str) -> str:
+    """Collapses case and whitespace so trivially different copies share a cache entry."""
+    return " ".join(text.lower().split())
+
+def cache_key(model_name: str, text: str) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model_name}:{digest}"
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store: an in-memory LRU in front of a size-bounded SQLite table.
+    Vectors are stored as float32 blobs. Safe to share between threads.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+                 memory_entries: int = EMBEDDING_CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_accessed ON embeddings (accessed_at)")
+        self._conn.commit()
+
+    def _remember(self, key: str, vector: list):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: list) -> dict:
+        """Returns {key: vector} for every key found in memory or on disk."""
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+
+            if missing:
+                unique_missing = list(dict.fromkeys(missing))
+                now = time.time()
+                # Stay well under SQLite's bound-parameter limit
+                for start in range(0, len(unique_missing), 500):
+                    chunk = unique_missing[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = array("f", blob).tolist()
+                        found[key] = vector
+                        self._remember(key, vector)
+                    if rows:
+                        self._conn.executemany(
+                            "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                            [(now, key) for key, _ in rows]
+                        )
+                self._conn.commit()
+                for key in missing:
+                    if key in found:
+                        self.disk_hits += 1
+                    else:
+                        self.misses += 1
+        return found
+
+    def put_many(self, entries: dict):
+        """Stores {key: vector}; prunes the least recently used rows once over `max_entries`."""
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            for key, vector in entries.items():
+                self._remember(key, vector)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in entries.items()]
+            )
+            self._writes_since_prune += len(entries)
+            # Counting rows is a full scan, so only check the bound every few thousand writes
+            if self._writes_since_prune >= 5_000:
+                self._writes_since_prune = 0
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,)
+            )
+            print(f"Embedding cache pruned {excess} least recently used entries.")
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+_caches = {} # pid -> EmbeddingCache; a SQLite connection must not be used across fork
+_cache_lock = threading.Lock()
+
+def _reset_after_fork():
+    global _cache_lock
+    _cache_lock = threading.Lock() # The parent may have held it at fork time
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def get_embedding_cache():
+    """Per-process cache instance, or None when disabled or the store cannot be opened."""
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    pid = os.getpid()
+    cache = _caches.get(pid)
+    if cache is None:
+        with _cache_lock:
+            cache = _caches.get(pid)
+            if cache is None:
+                try:
+                    cache = EmbeddingCache()
+                except Exception as e:
+                    print(f"Embedding cache unavailable, encoding without it: {e}")
+                    return None
+                _caches.clear() # Inherited from the parent; not ours to use or close
+                _caches[pid] = cache
+    return cache
@@ -1,12 +1,328 @@
 import os
-from sentence_transformers import SentenceTransformer
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from backend.pipeline.embedding_cache import get_embedding_cache, cache_key, normalize_text
 
 hf_token = os.getenv("HF_API_KEY") or os.getenv("HF_TOKEN")
+MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", 'all-MiniLM-L6-v2')
+# Known up front so importers (e.g. the vector store) never have to load the model to learn it
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", 384))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 1024))
+QUERY_EMBEDDING_TIMEOUT = float(os.getenv("QUERY_EMBEDDING_TIMEOUT", 60)) # Seconds a caller waits for its vector
 
-try:
-    model = SentenceTransformer('all-MiniLM-L6-v2', use_auth_token=hf_token)
-except Exception as e:
-    raise RuntimeError(f"Failed to load embedding model: {e}")
+# In-process LRU of question embeddings, keyed on normalized question text.
+# Warmed questions (the report sections) are pinned outside the LRU so they are never evicted.
+_query_cache = OrderedDict()
+_pinned_queries = {}
+_query_cache_lock = threading.Lock()
+_query_stats = {"hits": 0, "misses": 0}
+_query_batcher = None
+
+_batching_stats = {"texts": 0, "batches": 0, "tokens": 0, "padded_tokens": 0, "truncated": 0, "chunked": 0}
+_batching_stats_lock = threading.Lock()
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower() # torch | onnx | onnx-int8
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+EMBEDDING_MAX_SEQ_LENGTH = 256 # all-MiniLM-L6-v2 truncates inputs at 256 tokens
+# Texts are grouped by token length so short comments aren't padded to a long post's length;
+# a batch holds at most EMBEDDING_TOKEN_BUDGET tokens including padding
+EMBEDDING_TOKEN_BUDGET = int(os.getenv("EMBEDDING_TOKEN_BUDGET", 4096))
+# Texts over the model's limit: "truncate" (embed the first 256 tokens, counted in the stats)
+# or "chunk" (embed 256-token windows and average them, weighted by length)
+EMBEDDING_LONG_TEXT = os.getenv("EMBEDDING_LONG_TEXT", "truncate").lower()
+EMBEDDING_ONNX_DIR = os.getenv(
+    "EMBEDDING_ONNX_DIR",
+    os.path.join(os.path.dirname(__file__), '..', '.cache', 'onnx')
+)
+
+
+class EmbeddingBackend:
+    """Turns texts into L2-normalized vectors. Subclasses wrap a specific inference runtime."""
+    name = "base"
+
+    @property
+    def cache_name(self) -> str:
+        """Namespace for the embedding cache; backends whose vectors differ must not share one."""
+        return MODEL_NAME
+
+    def encode(self, texts: list, batch_size: int | None = None) -> list:
+        """Vectors for `texts`, run through the model `batch_size` (default EMBEDDING_BATCH_SIZE) at a time."""
+        raise NotImplementedError
+
+    def token_offsets(self, texts: list) -> list:
+        """Per text, the (start, end) character span of every token, without special tokens or truncation."""
+        raise NotImplementedError
+
+    def get_dimension(self) -> int:
+        raise NotImplementedError
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """The reference PyTorch implementation via sentence-transformers."""
+    name = "torch"
+
+    def __init__(self):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(MODEL_NAME, use_auth_token=hf_token)
+
+    def encode(self, texts: list, batch_size: int | None = None) -> list:
+        return self.model.encode(texts, batch_size=batch_size or EMBEDDING_BATCH_SIZE, normalize_embeddings=True).tolist()
+
+    def token_offsets(self, texts: list) -> list:
+        encoded = self.model.tokenizer(
+            texts, add_special_tokens=False, truncation=False,
+            return_offsets_mapping=True, verbose=False
+        )
+        return encoded["offset_mapping"]
+
+    def get_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    ONNX Runtime on CPU with the model's exported graph, plus the same mean pooling and
+    normalization sentence-transformers applies. `quantized=True` uses a dynamically
+    int8-quantized copy of the graph, created once next to the downloaded model.
+    """
+
+    def __init__(self, quantized: bool = False):
+        import numpy as np
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        from huggingface_hub import hf_hub_download
+
+        self.np = np
+        self.quantized = quantized
+        self.name = "onnx-int8" if quantized else "onnx"
+        repo_id = MODEL_NAME if "/" in MODEL_NAME else f"sentence-transformers/{MODEL_NAME}"
+
+        model_path = hf_hub_download(repo_id, "onnx/model.onnx", token=hf_token)
+        if quantized:
+            model_path = self._quantize(model_path)
+
+        tokenizer_path = hf_hub_download(repo_id, "tokenizer.json", token=hf_token)
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=EMBEDDING_MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        self.length_tokenizer = Tokenizer.from_file(tokenizer_path)
+        # tokenizer.json may ship with truncation and padding enabled; lengths must be the real ones
+        self.length_tokenizer.no_truncation()
+        self.length_tokenizer.no_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        output_names = [output.name for output in self.session.get_outputs()]
+        self.output_name = "last_hidden_state" if "last_hidden_state" in output_names else output_names[0]
+
+    @property
+    def cache_name(self) -> str:
+        # fp32 ONNX matches the PyTorch vectors; int8 ones drift slightly, so keep them apart
+        return f"{MODEL_NAME}+int8" if self.quantized else MODEL_NAME
+
+    def _quantize(self, model_path: str) -> str:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        os.makedirs(EMBEDDING_ONNX_DIR, exist_ok=True)
+        quantized_path = os.path.join(EMBEDDING_ONNX_DIR, f"{MODEL_NAME.replace('/', '_')}_int8.onnx")
+        if not os.path.exists(quantized_path):
+            print(f"Quantizing {model_path} to int8 at {quantized_path}...")
+            quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        return quantized_path
+
+    def _encode_batch(self, texts: list):
+        np = self.np
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run([self.output_name], feeds)[0] # (batch, seq, dim)
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, texts: list, batch_size: int | None = None) -> list:
+        batch_size = batch_size or EMBEDDING_BATCH_SIZE
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            vectors.extend(self._encode_batch(texts[start:start + batch_size]).tolist())
+        return vectors
+
+    def token_offsets(self, texts: list) -> list:
+        return [encoding.offsets for encoding in self.length_tokenizer.encode_batch(texts, add_special_tokens=False)]
+
+    def get_dimension(self) -> int:
+        return len(self.encode(["dimension probe"])[0])
+
+
+def create_backend(name: str = EMBEDDING_BACKEND) -> EmbeddingBackend:
+    if name == "torch":
+        return SentenceTransformerBackend()
+    if name == "onnx":
+        return OnnxBackend(quantized=False)
+    if name == "onnx-int8":
+        return OnnxBackend(quantized=True)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{name}'. Use torch, onnx or onnx-int8.")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def _reset_backend_lock():
+    global _backend_lock
+    # A fork while another thread was loading the model would otherwise copy the lock held forever
+    _backend_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_backend_lock)
+
+def get_backend() -> EmbeddingBackend:
+    """Creates the configured backend (and imports its runtime) on first use rather than at import time."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                try:
+                    backend = create_backend()
+                except Exception as e:
+                    raise RuntimeError(f"Failed to load embedding model: {e}")
+                dimension = backend.get_dimension()
+                if dimension != EMBEDDING_DIMENSION:
+                    print(f"WARNING: {MODEL_NAME} produces {dimension}-d vectors but EMBEDDING_DIMENSION is {EMBEDDING_DIMENSION}.")
+                print(f"Embedding backend loaded: {backend.name}")
+                _backend = backend
+    return _backend
+
+def plan_batches(lengths: list, token_budget: int = EMBEDDING_TOKEN_BUDGET, max_batch_size: int = EMBEDDING_BATCH_SIZE) -> list:
+    """
+    Groups indexes into batches of similar length. Texts are sorted shortest first and
+    bucketed by power-of-two length, so no batch pads its items to more than twice their
+    length; within a bucket a batch grows until its padded size (items x longest item)
+    would exceed `token_budget` tokens.
+    """
+    def bucket(length: int) -> int:
+        return max(16, 1 << (length - 1).bit_length())
+
+    batches, batch = [], []
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # Sorted ascending, so the newcomer is the batch's longest item
+        if batch and (
+            len(batch) >= max_batch_size
+            or (len(batch) + 1) * lengths[index] > token_budget
+            or bucket(lengths[index]) != bucket(lengths[batch[0]])
+        ):
+            batches.append(batch)
+            batch = []
+        batch.append(index)
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _split_long_texts(texts: list, offsets: list):
+    """
+    Applies the EMBEDDING_LONG_TEXT policy. Returns (pieces, lengths, owners): the texts to
+    encode with their token lengths (special tokens included) and the input index each
+    belongs to. In chunk mode an over-length text becomes several consecutive windows.
+    """
+    window = EMBEDDING_MAX_SEQ_LENGTH - 2 # Room for [CLS] and [SEP]
+    pieces, lengths, owners = [], [], []
+    truncated = chunked = 0
+    for index, (text, spans) in enumerate(zip(texts, offsets)):
+        if len(spans) <= window:
+            pieces.append(text)
+            lengths.append(len(spans) + 2)
+            owners.append(index)
+        elif EMBEDDING_LONG_TEXT == "chunk":
+            chunked += 1
+            for start in range(0, len(spans), window):
+                chunk_spans = spans[start:start + window]
+                pieces.append(text[chunk_spans[0][0]:chunk_spans[-1][1]])
+                lengths.append(len(chunk_spans) + 2)
+                owners.append(index)
+        else:
+            truncated += 1
+            pieces.append(text)
+            lengths.append(EMBEDDING_MAX_SEQ_LENGTH)
+            owners.append(index)
+    with _batching_stats_lock:
+        _batching_stats["truncated"] += truncated
+        _batching_stats["chunked"] += chunked
+    if truncated:
+        print(f"{truncated} texts exceed {EMBEDDING_MAX_SEQ_LENGTH} tokens and were truncated (EMBEDDING_LONG_TEXT=truncate).")
+    return pieces, lengths, owners
+
+def encode_length_bucketed(backend: EmbeddingBackend, texts: list) -> list:
+    """
+    Encodes texts in length-sorted, token-budgeted batches and returns vectors in input order.
+    Chunked texts get the length-weighted mean of their windows' vectors, re-normalized.
+    """
+    if len(texts) <= 1:
+        return backend.encode(texts)
+    try:
+        offsets = backend.token_offsets(texts)
+    except NotImplementedError:
+        return backend.encode(texts)
+
+    pieces, lengths, owners = _split_long_texts(texts, offsets)
+    piece_vectors = [None] * len(pieces)
+    batches = plan_batches(lengths)
+    for batch in batches:
+        for index, vector in zip(batch, backend.encode([pieces[i] for i in batch])):
+            piece_vectors[index] = vector
+
+    with _batching_stats_lock:
+        _batching_stats["texts"] += len(texts)
+        _batching_stats["batches"] += len(batches)
+        _batching_stats["tokens"] += sum(lengths)
+        _batching_stats["padded_tokens"] += sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+
+    if len(pieces) == len(texts):
+        return piece_vectors
+
+    vectors = [None] * len(texts)
+    for owner, length, vector in zip(owners, lengths, piece_vectors):
+        weighted = [length * x for x in vector]
+        vectors[owner] = weighted if vectors[owner] is None else [a + b for a, b in zip(vectors[owner], weighted)]
+    for index, vector in enumerate(vectors):
+        norm = sum(x * x for x in vector) ** 0.5
+        vectors[index] = [x / norm for x in vector] if norm else vector
+    return vectors
+
+def encode_texts(texts: list) -> list:
+    """
+    Embed a list of texts, returning normalized vectors in input order.
+    Texts already in the embedding cache are not re-encoded; duplicates are encoded once.
+    """
+    if not texts:
+        return []
+
+    backend = get_backend()
+    cache = get_embedding_cache()
+    if cache is None:
+        return encode_length_bucketed(backend, texts)
+
+    # Chunked and truncated vectors of long texts differ, so the modes don't share cache entries
+    namespace = backend.cache_name + ("+chunked" if EMBEDDING_LONG_TEXT == "chunk" else "")
+    keys = [cache_key(namespace, text) for text in texts]
+    cached = cache.get_many(keys)
+
+    # Encode each distinct uncached text once
+    to_encode = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in to_encode:
+            to_encode[key] = text
+
+    if to_encode:
+        vectors = encode_length_bucketed(backend, list(to_encode.values()))
+        fresh = dict(zip(to_encode.keys(), vectors))
+        cache.put_many(fresh)
+        cached.update(fresh)
+
+    return [cached[key] for key in keys]
 
 def get_embedding(text: str):
     """Generate a vector embedding for the given text."""
@@ -14,7 +330,168 @@ def get_embedding(text: str):
         return None
 
     try:
-        return model.encode(text, normalize_embeddings=True).tolist()
+        return encode_texts([text])[0]
+    except Exception as e:
+        print(f"Embedding generation failed: {e}")
+        return None
+
+def _lookup_query(key: str):
+    """Returns the cached vector for a normalized question and counts the hit or miss."""
+    with _query_cache_lock:
+        vector = _pinned_queries.get(key)
+        if vector is None:
+            vector = _query_cache.get(key)
+            if vector is not None:
+                _query_cache.move_to_end(key)
+        _query_stats["hits" if vector is not None else "misses"] += 1
+        return vector
+
+def _remember_query(key: str, vector):
+    if vector is None:
+        return
+    with _query_cache_lock:
+        _query_cache[key] = vector
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+
+def enable_query_batching():
+    """
+    Routes query-embedding cache misses through a QueryEmbeddingBatcher, so concurrent
+    requests in this process share one encode call. Meant for the API process.
+    """
+    global _query_batcher
+    from backend.pipeline.query_batcher import QueryEmbeddingBatcher
+    if _query_batcher is None:
+        _query_batcher = QueryEmbeddingBatcher(encode_texts)
+    return _query_batcher
+
+def query_batcher_stats() -> dict:
+    return _query_batcher.stats() if _query_batcher else {}
+
+def submit_query_embedding(question: str) -> Future:
+    """
+    Future form of get_query_embedding for callers that must not block (e.g. async handlers).
+    Cache hits resolve immediately; misses go through the batcher when it is enabled.
+    """
+    future = Future()
+    if not question or not isinstance(question, str) or not question.strip():
+        future.set_result(None)
+        return future
+
+    key = normalize_text(question)
+    vector = _lookup_query(key)
+    if vector is not None:
+        future.set_result(vector)
+        return future
+
+    if _query_batcher is None:
+        try:
+            vector = get_embedding(question)
+            _remember_query(key, vector)
+            future.set_result(vector)
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def remember(done: Future):
+        if not done.cancelled() and done.exception() is None:
+            _remember_query(key, done.result())
+    batched = _query_batcher.submit(question)
+    batched.add_done_callback(remember)
+    return batched
+
+def get_query_embedding(question: str):
+    """Embedding for a user or report question, served from the query LRU when possible."""
+    try:
+        return submit_query_embedding(question).result(timeout=QUERY_EMBEDDING_TIMEOUT)
+    except Exception as e:
+        print(f"Embedding generation failed: {e}")
+        return None
+
+async def aget_query_embedding(question: str):
+    """Awaitable get_query_embedding that never blocks the event loop on the model."""
+    try:
+        if _query_batcher is None:
+            return await asyncio.to_thread(get_query_embedding, question)
+        return await asyncio.wait_for(asyncio.wrap_future(submit_query_embedding(question)), QUERY_EMBEDDING_TIMEOUT)
     except Exception as e:
         print(f"Embedding generation failed: {e}")
         return None
+
+def get_query_embeddings(questions: list) -> list:
+    """Batch form of get_query_embedding: cache misses are encoded together in one call."""
+    vectors = [None] * len(questions)
+    misses = {}
+    with _query_cache_lock:
+        for index, question in enumerate(questions):
+            if not question or not isinstance(question, str) or not question.strip():
+                continue
+            key = normalize_text(question)
+            vector = _pinned_queries.get(key) or _query_cache.get(key)
+            if vector is not None:
+                _query_stats["hits"] += 1
+                vectors[index] = vector
+            else:
+                _query_stats["misses"] += 1
+                misses.setdefault(key, []).append(index)
+
+    if misses:
+        try:
+            encoded = encode_texts([questions[indexes[0]] for indexes in misses.values()])
+        except Exception as e:
+            print(f"Embedding generation failed: {e}")
+            return vectors
+        with _query_cache_lock:
+            for (key, indexes), vector in zip(misses.items(), encoded):
+                _query_cache[key] = vector
+                for index in indexes:
+                    vectors[index] = vector
+            while len(_query_cache) > QUERY_CACHE_SIZE:
+                _query_cache.popitem(last=False)
+    return vectors
+
+def warm_query_cache_in_background(questions):
+    """Runs warm_query_cache on a daemon thread so process startup never waits for the model."""
+    if os.getenv("WARM_QUERY_CACHE_ON_STARTUP", "true").lower() != "true":
+        return
+    questions = list(questions)
+    threading.Thread(target=warm_query_cache, args=(questions,), name="warm-query-cache", daemon=True).start()
+
+def warm_query_cache(questions) -> int:
+    """Embeds and pins the given questions ahead of time in one batch. Returns how many were added."""
+    with _query_cache_lock:
+        pending = {normalize_text(q): q for q in questions if q and normalize_text(q) not in _pinned_queries}
+    if not pending:
+        return 0
+    try:
+        vectors = encode_texts(list(pending.values()))
+    except Exception as e:
+        print(f"Query cache warm-up failed: {e}")
+        return 0
+    with _query_cache_lock:
+        for key, vector in zip(pending, vectors):
+            _pinned_queries[key] = vector
+    print(f"Warmed query embedding cache with {len(pending)} questions.")
+    return len(pending)
+
+def query_cache_stats() -> dict:
+    with _query_cache_lock:
+        lookups = _query_stats["hits"] + _query_stats["misses"]
+        return {
+            **_query_stats,
+            "hit_rate": round(_query_stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(_query_cache),
+            "pinned": len(_pinned_queries),
+        }
+
+def embedding_cache_stats() -> dict:
+    cache = get_embedding_cache()
+    return cache.stats() if cache else {}
+
+def embedding_batching_stats() -> dict:
+    with _batching_stats_lock:
+        stats = dict(_batching_stats)
+    stats["padding_efficiency"] = round(stats["tokens"] / stats["padded_tokens"], 4) if stats["padded_tokens"] else 1.0
+    stats["token_budget"] = EMBEDDING_TOKEN_BUDGET
+    stats["long_text_mode"] = EMBEDDING_LONG_TEXT
+    return stats
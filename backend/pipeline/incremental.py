@@ -0,0 +1,64 @@
+import hashlib
+from sqlalchemy.orm import Session
+
+from backend.db.models import IngestWatermark
+
+def content_hash(text: str) -> str:
+    """Stable hash of the content stored with each point, used to detect changed items."""
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+def watermark_keys(item: dict) -> list:
+    """
+    Watermark keys an item advances: its source, plus the video or subreddit it came from
+    (e.g. "Reddit" and "Reddit:technology") so scrapers can resume each feed separately.
+    Items from a scan that stopped before reaching the feed's previous watermark (marked
+    `partial_scan` by the scraper) leave the feed's key alone, so the gap is filled next run.
+    """
+    source = item.get("source")
+    if not source:
+        return []
+    keys = [source]
+    scope = item.get("video_id") or item.get("subreddit")
+    if scope and not item.get("partial_scan"):
+        keys.append(f"{source}:{scope}")
+    return keys
+
+def load_watermarks(db: Session, product_id: int) -> dict:
+    """Returns {source_key: newest ingested created_at} for a product."""
+    rows = db.query(IngestWatermark).filter(IngestWatermark.product_id == product_id).all()
+    return {row.source_key: row.watermark for row in rows}
+
+def scoped_watermarks(watermarks: dict, source: str) -> dict:
+    """Extracts {scope: watermark} for one source, e.g. per-video marks for YouTube comments."""
+    prefix = f"{source}:"
+    return {key[len(prefix):]: value for key, value in watermarks.items() if key.startswith(prefix)}
+
+def observe_watermarks(newest: dict, item: dict):
+    """
+    Folds one item's `created_at` into a running {source_key: newest created_at} map.
+    Timestamps within one source share a format, so ISO strings compare correctly.
+    """
+    created_at = item.get("created_at")
+    if not created_at:
+        return # Google results carry no date
+    for key in watermark_keys(item):
+        if created_at > newest.get(key, ""):
+            newest[key] = created_at
+
+def advance_watermarks(db: Session, product_id: int, newest: dict):
+    """Moves each stored watermark forward to the newest `created_at` observed this ingest."""
+    if not newest:
+        return
+
+    existing = {
+        row.source_key: row
+        for row in db.query(IngestWatermark).filter(IngestWatermark.product_id == product_id).all()
+    }
+    for key, created_at in newest.items():
+        row = existing.get(key)
+        if row is None:
+            db.add(IngestWatermark(product_id=product_id, source_key=key, watermark=created_at))
+        elif created_at > row.watermark:
+            row.watermark = created_at
+    db.commit()
+    print(f"Advanced {len(newest)} ingest watermarks for product {product_id}.")
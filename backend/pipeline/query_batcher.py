@@ -0,0 +1,122 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", 32))
+QUERY_BATCH_MAX_WAIT_MS = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", 5))
+
+class QueryEmbeddingBatcher:
+    """
+    Collects query texts from concurrent callers and encodes them together.
+
+    A single background thread takes the first waiting query, keeps collecting for up to
+    `max_wait_ms` or until `max_batch_size` queries are queued, runs one `encode` call for
+    the whole batch and resolves each caller's future. `encode` takes a list of texts and
+    returns vectors in the same order.
+    """
+
+    def __init__(self, encode, max_batch_size: int = QUERY_BATCH_MAX_SIZE, max_wait_ms: float = QUERY_BATCH_MAX_WAIT_MS):
+        self.encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes = Counter()
+        self._queue_wait_total = 0.0
+        self._encode_total = 0.0
+        self._max_queue_depth = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queues a text and returns a future resolving to its vector."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            with self._stats_lock:
+                self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def embed(self, text: str, timeout: float = 30):
+        """Blocking helper for synchronous callers."""
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Whatever is already queued joins immediately, even past the deadline
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _resolve(future: Future, vector=None, error: Exception | None = None):
+        try:
+            if error is None:
+                future.set_result(vector)
+            else:
+                future.set_exception(error)
+        except Exception: # Cancelled meanwhile (e.g. the client disconnected); nobody is waiting
+            pass
+
+    def _run(self):
+        while True:
+            # Nothing may end this loop: once the thread dies, every queued caller waits forever
+            try:
+                self._process(self._collect())
+            except Exception as e:
+                print(f"Query embedding batcher error: {e}")
+
+    def _process(self, batch: list):
+        # Drop callers that cancelled while queued, so their texts are not encoded
+        live = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+        started = time.perf_counter()
+        if live:
+            try:
+                vectors = self.encode([text for text, _, _ in live])
+                for (_, future, _), vector in zip(live, vectors):
+                    self._resolve(future, vector)
+            except Exception as e:
+                for _, future, _ in live:
+                    self._resolve(future, error=e)
+        finished = time.perf_counter()
+
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes[len(batch)] += 1
+            self._queue_wait_total += sum(started - queued_at for _, _, queued_at in batch)
+            self._encode_total += finished - started
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "avg_queue_wait_ms": round(self._queue_wait_total / self._items * 1000, 2) if self._items else 0.0,
+                "avg_encode_ms": round(self._encode_total / self._batches * 1000, 2) if self._batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
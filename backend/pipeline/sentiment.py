@@ -1,6 +1,23 @@
+import os
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 _analyzer = None
 
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", os.cpu_count() or 1))
+SENTIMENT_CHUNK_SIZE = int(os.getenv("SENTIMENT_CHUNK_SIZE", 25)) # Texts per task sent to a worker process
+SENTIMENT_PARALLEL_MIN = int(os.getenv("SENTIMENT_PARALLEL_MIN", 50)) # Smaller batches are scored inline
+SENTIMENT_MEMO_SIZE = int(os.getenv("SENTIMENT_MEMO_SIZE", 50_000))
+
+_pool = None
+_pool_failed = False
+_pool_lock = threading.Lock()
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
 def get_analyzer():
     global _analyzer
     if _analyzer is None:
@@ -18,3 +35,73 @@ def analyze_sentiment(text: str) -> dict:
     else:
         label = "neutral"
     return {**scores, "label": label}
+
+def _score_chunk(texts: list) -> list:
+    return [analyze_sentiment(text) for text in texts]
+
+def _get_pool():
+    """Lazily starts the worker pool; returns None where child processes are not allowed."""
+    global _pool, _pool_failed
+    if multiprocessing.current_process().daemon:
+        # Celery prefork children are daemonic and may not have children of their own; there
+        # the worker's concurrency already spreads scoring across cores
+        return None
+    if _pool is None and not _pool_failed and SENTIMENT_WORKERS > 1:
+        with _pool_lock:
+            if _pool is None and not _pool_failed:
+                try:
+                    # spawn, not fork: worker processes must not inherit the parent's threads and clients
+                    _pool = ProcessPoolExecutor(
+                        max_workers=SENTIMENT_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                except Exception as e:
+                    print(f"Sentiment process pool unavailable, scoring inline: {e}")
+                    _pool_failed = True
+    return _pool
+
+def _score_parallel(texts: list, chunk_size: int) -> list:
+    global _pool_failed
+    pool = _get_pool()
+    if pool is not None and len(texts) >= SENTIMENT_PARALLEL_MIN:
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        try:
+            results = []
+            for chunk_result in pool.map(_score_chunk, chunks):
+                results.extend(chunk_result)
+            return results
+        except Exception as e:
+            print(f"Parallel sentiment scoring failed, scoring inline: {e}")
+            _pool_failed = True
+    return _score_chunk(texts)
+
+def analyze_sentiment_batch(texts: list, chunk_size: int = SENTIMENT_CHUNK_SIZE) -> list:
+    """
+    Scores a list of texts, returning the same dicts as analyze_sentiment in input order.
+    Results are memoized by content hash, so duplicate texts are scored once; the rest are
+    scored in chunks of `chunk_size` on a process pool spread across all cores.
+    """
+    keys = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+    results = {}
+    with _memo_lock:
+        for key in keys:
+            if key in _memo:
+                _memo.move_to_end(key)
+                results[key] = _memo[key]
+
+    to_score = {}
+    for key, text in zip(keys, texts):
+        if key not in results and key not in to_score:
+            to_score[key] = text
+
+    if to_score:
+        scored = _score_parallel(list(to_score.values()), max(1, chunk_size))
+        fresh = dict(zip(to_score.keys(), scored))
+        results.update(fresh)
+        with _memo_lock:
+            _memo.update(fresh)
+            while len(_memo) > SENTIMENT_MEMO_SIZE:
+                _memo.popitem(last=False)
+
+    # Copy so callers can't mutate the memoized dicts
+    return [dict(results[key]) for key in keys]
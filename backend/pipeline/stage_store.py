@@ -0,0 +1,51 @@
+import os
+import json
+from typing import Iterable
+
+from backend.redis_client import get_redis
+
+# Scraped items travel between ingest stages as Redis lists; Celery messages and the result
+# backend only carry the list keys and offsets
+STAGE_TTL = int(os.getenv("INGEST_STAGE_TTL", 6 * 3600)) # Seconds an unfinished run's data is kept
+WRITE_CHUNK = 500
+
+def stage_key(run_id: str, name: str) -> str:
+    return f"insightgenie:ingest:{run_id}:{name}"
+
+def _client():
+    client = get_redis()
+    if client is None:
+        raise RuntimeError("Staged ingestion needs Redis (REDIS_URL or CELERY_BROKER_URL).")
+    return client
+
+def write_items(key: str, items: Iterable) -> int:
+    """Appends items to the stage list in chunks, so a large scrape is never held in memory. Returns the count."""
+    client = _client()
+    count, chunk = 0, []
+
+    def flush():
+        pipe = client.pipeline()
+        pipe.rpush(key, *chunk)
+        pipe.expire(key, STAGE_TTL)
+        pipe.execute()
+
+    for item in items:
+        chunk.append(json.dumps(item))
+        count += 1
+        if len(chunk) == WRITE_CHUNK:
+            flush()
+            chunk = []
+    if chunk:
+        flush()
+    return count
+
+def iter_items(key: str, start: int, stop: int):
+    """Yields items start..stop-1 of a stage list, reading WRITE_CHUNK at a time."""
+    client = _client()
+    for offset in range(start, stop, WRITE_CHUNK):
+        for raw in client.lrange(key, offset, min(offset + WRITE_CHUNK, stop) - 1):
+            yield json.loads(raw)
+
+def delete_stages(keys: list):
+    if keys:
+        _client().delete(*keys)
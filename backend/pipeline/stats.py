@@ -0,0 +1,119 @@
+import sys
+from collections import Counter
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.db.models import ProductSentimentStats
+
+SENTIMENT_LABELS = ("positive", "negative", "neutral")
+STATS_FIELDS = ["sentiment_label", "sentiment_compound", "source"]
+
+def new_delta() -> dict:
+    """An empty change-set for a product's aggregate counters."""
+    return {"labels": Counter(), "compound_sum": 0.0, "sources": Counter()}
+
+def add_to_delta(delta: dict, payload: dict, sign: int = 1):
+    """Counts a stored payload into `delta` (sign=-1 removes a payload being replaced)."""
+    label = payload.get("sentiment_label") or "neutral"
+    delta["labels"][label] += sign
+    delta["compound_sum"] += sign * float(payload.get("sentiment_compound") or 0.0)
+    source = payload.get("source")
+    if source:
+        delta["sources"][source] += sign
+
+def _get_or_create(db: Session, product_id: int) -> ProductSentimentStats:
+    # SELECT ... FOR UPDATE locks nothing while the row doesn't exist, so concurrent first
+    # writers would all INSERT it. Create it first in a savepoint (a writer that loses the race
+    # gets IntegrityError and rolls back only the savepoint), then lock it. Plain INSERT works
+    # on every dialect, unlike ON CONFLICT / INSERT IGNORE.
+    exists = db.query(ProductSentimentStats.product_id).filter(
+        ProductSentimentStats.product_id == product_id
+    ).first()
+    if exists is None:
+        try:
+            with db.begin_nested():
+                db.add(ProductSentimentStats(product_id=product_id, positive_count=0, negative_count=0,
+                                             neutral_count=0, compound_sum=0.0, source_counts={}))
+        except IntegrityError:
+            pass # Created concurrently by another writer
+    return db.query(ProductSentimentStats).filter(
+        ProductSentimentStats.product_id == product_id
+    ).populate_existing().with_for_update().one()
+
+def _set_counts(row: ProductSentimentStats, labels: Counter, compound_sum: float, sources: dict):
+    row.positive_count = max(0, labels.get("positive", 0))
+    row.negative_count = max(0, labels.get("negative", 0))
+    row.neutral_count = max(0, labels.get("neutral", 0))
+    row.compound_sum = compound_sum
+    row.source_counts = {source: count for source, count in sources.items() if count > 0}
+
+def apply_delta(db: Session, product_id: int, delta: dict):
+    """Adds a change-set to the product's counters under a row lock, then commits."""
+    if not any(delta["labels"].values()) and not delta["compound_sum"] and not any(delta["sources"].values()):
+        return
+    row = _get_or_create(db, product_id)
+    labels = Counter({
+        "positive": row.positive_count or 0,
+        "negative": row.negative_count or 0,
+        "neutral": row.neutral_count or 0,
+    })
+    labels.update(delta["labels"])
+    sources = Counter(row.source_counts or {})
+    sources.update(delta["sources"])
+    _set_counts(row, labels, (row.compound_sum or 0.0) + delta["compound_sum"], sources)
+    db.commit()
+
+def rebuild_stats(db: Session, qdrant, product_id: int) -> dict:
+    """Recomputes a product's counters from a full scroll of its points in Qdrant (repair path)."""
+    delta = new_delta()
+    for records in qdrant.iter_product_payloads(product_id, STATS_FIELDS):
+        for record in records:
+            add_to_delta(delta, record.payload or {})
+    row = _get_or_create(db, product_id)
+    _set_counts(row, delta["labels"], delta["compound_sum"], delta["sources"])
+    db.commit()
+    return summarize(row)
+
+def summarize(row: ProductSentimentStats | None) -> dict:
+    """Whole-corpus statistics in the shape the engine and the stats endpoint expect."""
+    counts = {
+        "positive": (row.positive_count or 0) if row else 0,
+        "negative": (row.negative_count or 0) if row else 0,
+        "neutral": (row.neutral_count or 0) if row else 0,
+    }
+    total = sum(counts.values())
+    return {
+        "total": total,
+        "sentiment_counts": counts,
+        "sentiment_breakdown": {
+            label: round((count / total) * 100, 1) if total > 0 else 0
+            for label, count in counts.items()
+        },
+        "average_compound": round(row.compound_sum / total, 4) if row and total else 0.0,
+        "source_counts": dict(row.source_counts or {}) if row else {},
+    }
+
+def get_product_stats(db: Session, product_id: int) -> dict:
+    row = db.query(ProductSentimentStats).filter(ProductSentimentStats.product_id == product_id).first()
+    return summarize(row)
+
+if __name__ == '__main__':
+    # Usage: python -m backend.pipeline.stats rebuild <product_id> [<product_id> ...]
+    import os
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+    from backend.db.database import SessionLocal
+    from backend.db.vector_store import QdrantDB
+
+    if len(sys.argv) < 3 or sys.argv[1] != "rebuild":
+        print("Usage: python -m backend.pipeline.stats rebuild <product_id> [<product_id> ...]")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        qdrant = QdrantDB()
+        for product_id in map(int, sys.argv[2:]):
+            print(f"Rebuilt stats for product {product_id}: {rebuild_stats(db, qdrant, product_id)}")
+    finally:
+        db.close()
@@ -1,117 +1,512 @@
-import math
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
 from sqlalchemy.orm import Session
 from tqdm import tqdm
+from celery import chord, group
 
 from backend.db.database import SessionLocal
 from backend.db.models import Product
-from backend.db.vector_store import QdrantDB
-from backend.scrapers.youtube_scraper import scrape_youtube
-from backend.scrapers.reddit_scraper import scrape_reddit
-from backend.scrapers.google_search_scraper import scrape_google_search
-from backend.pipeline.sentiment import analyze_sentiment
+from backend.db.vector_store import QdrantDB, create_deterministic_id, compact_payload
+from backend.pipeline.sentiment import analyze_sentiment_batch
+from backend.pipeline.embeddings import embedding_cache_stats
+from backend.pipeline.stats import STATS_FIELDS, new_delta, add_to_delta, apply_delta, rebuild_stats
+from backend.scrapers.rate_limit import quota_usage
+from backend.pipeline.stage_store import stage_key, write_items, iter_items, delete_stages
+from backend.pipeline.dedup import fold_near_duplicates, unfold_near_duplicates
+from backend.pipeline.incremental import content_hash, load_watermarks, scoped_watermarks, observe_watermarks, advance_watermarks
+from backend.llm.answer_cache import bump_corpus_version
 from backend.celery_app import celery
 
-BATCH_SIZE = 100
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 100))
+SCRAPE_MAX_WORKERS = int(os.getenv("SCRAPE_MAX_WORKERS", 3))
+SCRAPE_SOURCE_TIMEOUT = float(os.getenv("SCRAPE_SOURCE_TIMEOUT", 300)) # Seconds allowed per source
+ITEM_QUEUE_SIZE = int(os.getenv("INGEST_ITEM_QUEUE_SIZE", 500)) # Scraped items buffered ahead of processing
+UPLOAD_QUEUE_SIZE = int(os.getenv("INGEST_UPLOAD_QUEUE_SIZE", 2)) # Embedded batches waiting for upload
+# Bulk mode: parallel uploaders send batches with wait=False and one barrier waits for all of them
+BULK_UPLOAD = os.getenv("INGEST_BULK_UPLOAD", "true").lower() == "true"
+UPLOAD_WORKERS = int(os.getenv("INGEST_UPLOAD_WORKERS", 4)) # Concurrent uploads in bulk mode
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", 1000)) # Items per embed task
 
-def process_and_store(items: list, product_id: int, qdrant: QdrantDB):
-    total_items = len(items)
-    total_batches = math.ceil(total_items / BATCH_SIZE)
+_DONE = object() # End-of-stream marker for the stage queues
 
-    print(f"Preparing to upsert {total_items} items in {total_batches} batches of {BATCH_SIZE}...")
+def _build_scrape_jobs(config, query: str, watermarks: dict | None = None, product_id: int | None = None) -> dict:
+    """
+    Maps each enabled source name to a zero-argument callable returning an iterator of its items.
+    With `watermarks` (incremental mode) scrapers only ask for data newer than the last ingest.
+    API usage is charged to `product_id` in the scrapers' shared rate limiter.
+    """
+    # Imported here so processes that only enqueue tasks (the API) skip the scraper client libraries
+    from backend.scrapers.youtube_scraper import iter_youtube_comments
+    from backend.scrapers.reddit_scraper import iter_reddit_posts
+    from backend.scrapers.google_search_scraper import iter_google_search
 
-    payloads_to_upsert = []
+    watermarks = watermarks or {}
+    # Read config values up front so worker threads never touch the ORM session
+    youtube_keywords = list(config.youtube_keywords or [])
+    reddit_subreddits = list(config.reddit_subreddits or [])
 
-    for i, item in enumerate(tqdm(items, desc="Processing Items")):
+    jobs = {}
+    if youtube_keywords:
+        jobs["YouTube"] = lambda: iter_youtube_comments(
+            query=query,
+            keywords=youtube_keywords,
+            max_videos=15, # Reduced from 30 for faster testing, adjust as needed
+            since_by_video=scoped_watermarks(watermarks, "YouTube Comment"),
+            product_id=product_id
+        )
+    if reddit_subreddits:
+        jobs["Reddit"] = lambda: iter_reddit_posts(
+            search_queries=[query],
+            subreddits=reddit_subreddits,
+            limit=50,
+            since_by_subreddit=scoped_watermarks(watermarks, "Reddit"),
+            product_id=product_id
+        )
+    jobs["Google Search"] = lambda: iter_google_search(
+        query=query,
+        limit=10, # Get top 10 results
+        product_id=product_id
+    )
+    return jobs
+
+def _put(q: queue.Queue, value, stop: threading.Event) -> bool:
+    """Blocking put that gives up once `stop` is set, so producers never hang on a dead consumer."""
+    while not stop.is_set():
+        try:
+            q.put(value, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def stream_feedback(jobs: dict, max_workers: int = SCRAPE_MAX_WORKERS, timeout: float = SCRAPE_SOURCE_TIMEOUT):
+    """
+    Runs the scrape jobs concurrently on a bounded thread pool and yields their items as they
+    arrive, through a queue of at most ITEM_QUEUE_SIZE items. Each source gets `timeout` seconds
+    from the moment it starts; a source that fails or times out is logged and stops contributing,
+    without affecting the others.
+    """
+    items = queue.Queue(maxsize=ITEM_QUEUE_SIZE)
+    stop = threading.Event()
+    started_at = {}
+    abandoned = set()
+
+    def produce(name, job):
+        started_at[name] = time.monotonic()
+        count = 0
+        try:
+            for item in job():
+                if name in abandoned or not _put(items, (name, item), stop):
+                    return
+                count += 1
+            elapsed = time.monotonic() - started_at[name]
+            print(f"--- {name}: collected {count} items in {elapsed:.1f}s ---")
+        except Exception as e:
+            print(f"❌ {name} scraping failed: {e}")
+        finally:
+            _put(items, (name, _DONE), stop)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="scrape")
+    for name, job in jobs.items():
+        executor.submit(produce, name, job)
+    running = set(jobs)
+
+    try:
+        while running:
+            try:
+                name, item = items.get(timeout=1)
+                if name not in running:
+                    continue # Late output from a timed-out source
+                if item is _DONE:
+                    running.discard(name)
+                else:
+                    yield item
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            for name in list(running):
+                if name in started_at and now - started_at[name] > timeout:
+                    print(f"❌ {name} scraping timed out after {timeout:.0f}s. Skipping its remaining results.")
+                    abandoned.add(name)
+                    running.discard(name)
+    finally:
+        stop.set()
+        # Don't block on timed-out scrapers; their threads finish in the background.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _valid_items(items: Iterable):
+    for item in items:
         source_id = item.get("source_id")
         content = item.get("content")
 
         if not source_id or not content or not content.strip():
             print(f"Skipping item due to missing ID or invalid content.")
             continue
+        yield item
 
-        # Run sentiment analysis for all content
-        sentiment_result = analyze_sentiment(content)
+def _batched(items: Iterable, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-        payload = {
+def _prepare_batch(batch: list, product_id: int, qdrant: QdrantDB, incremental: bool):
+    """
+    Builds payloads for a batch of items and runs sentiment on the ones that need storing.
+    Returns (payloads, delta, canonical_counts, indexed): delta is the batch's change to the product's
+    aggregates, canonical_counts the new duplicate_count of stored points that copies were folded into,
+    and indexed the near-duplicate index entries to roll back if the batch is never stored.
+    """
+    candidates = {}
+    for item in batch:
+        point_id = create_deterministic_id(item.get("source"), item["source_id"])
+        candidates[point_id] = compact_payload({ # Repeats of the same item within a batch collapse to one point
             "product_id": product_id,
             "source": item.get("source"),
-            "external_id": source_id,
-            "content": content,
-            "created_at": item.get("created_at"), # Will be None for Google results
-            "sentiment_label": sentiment_result.get("label", "neutral"),
-            "sentiment_compound": sentiment_result.get("compound", 0.0)
+            "external_id": item["source_id"],
+            "content": item["content"],
+            "content_hash": content_hash(item["content"]),
+            "created_at": item.get("created_at") # Will be None for Google results
+        })
+
+    # One bulk lookup per batch, before any sentiment or embedding work
+    existing = qdrant.get_payloads(list(candidates), ["content_hash"] + STATS_FIELDS)
+
+    if incremental:
+        changed = {
+            point_id: payload for point_id, payload in candidates.items()
+            if existing.get(point_id, {}).get("content_hash") != payload["content_hash"]
         }
-        payloads_to_upsert.append(payload)
+        if len(changed) < len(candidates):
+            print(f"Skipping {len(candidates) - len(changed)} unchanged items already in Qdrant.")
+        candidates = changed
+
+    # Near-copies of content already stored are counted on their canonical point, not embedded
+    candidates, canonical_counts, indexed = fold_near_duplicates(product_id, candidates)
+
+    payloads = list(candidates.values())
+    # Run sentiment analysis for all new or changed content in one batch
+    sentiment_results = analyze_sentiment_batch([payload["content"] for payload in payloads])
+    for payload, sentiment_result in zip(payloads, sentiment_results):
+        payload["sentiment_label"] = sentiment_result.get("label", "neutral")
+        payload["sentiment_compound"] = sentiment_result.get("compound", 0.0)
+
+    # Replaced points leave the aggregates before their new version is counted
+    delta = new_delta()
+    for point_id, payload in candidates.items():
+        if point_id in existing:
+            add_to_delta(delta, existing[point_id], sign=-1)
+        add_to_delta(delta, payload)
+    return payloads, delta, canonical_counts, indexed
+
+def process_and_store(items: Iterable, product_id: int, qdrant: QdrantDB,
+                      incremental: bool = False, watermarks: dict | None = None,
+                      bulk: bool = BULK_UPLOAD) -> int:
+    """
+    Streams items through sentiment -> embedding -> upload in batches of BATCH_SIZE.
+    Uploads run on their own threads behind a bounded queue, so batch N+1 is embedded while
+    batch N is uploaded and memory stays flat regardless of corpus size.
+    In bulk mode UPLOAD_WORKERS threads upload concurrently with wait=False, and a single
+    barrier at the end waits until Qdrant has applied them all; otherwise one thread uploads
+    each batch with wait=True.
+    In incremental mode, items already stored with identical content are skipped before
+    sentiment and embedding. Near-duplicates of stored content are folded into the
+    duplicate_count of their canonical point instead of being stored. The product's sentiment aggregates are updated as each batch lands.
+    `watermarks`, if given, collects the newest `created_at` per source.
+    Returns the number of items upserted.
+    """
+    workers = max(1, UPLOAD_WORKERS) if bulk else 1
+    mode = f"bulk, {workers} upload workers" if bulk else "wait per batch"
+    print(f"Streaming items to Qdrant in batches of {BATCH_SIZE} ({mode})...")
+
+    uploads = queue.Queue(maxsize=max(UPLOAD_QUEUE_SIZE, workers))
+    upload_errors = []
+    unstored = [] # Near-duplicate index entries of batches that never reached Qdrant
+    uploaded = {} # Point id -> content_hash, checked by the bulk barrier
+    upload_seconds = [0.0]
+    stats_lock = threading.Lock()
+
+    def upload_worker():
+        db = SessionLocal()
+        try:
+            while True:
+                work = uploads.get()
+                if work is _DONE:
+                    return
+                points, delta, indexed = work
+                if upload_errors:
+                    unstored.append(indexed)
+                    continue # Drain without uploading once a batch has failed
+                try:
+                    print(f"\nUpserting batch {len(points)} items...")
+                    started = time.perf_counter()
+                    qdrant.upsert_points(points, wait=not bulk)
+                    with stats_lock:
+                        upload_seconds[0] += time.perf_counter() - started
+                        uploaded.update((str(point.id), (point.payload or {}).get("content_hash")) for point in points)
+                except Exception as e:
+                    unstored.append(indexed)
+                    upload_errors.append(e)
+                    continue
+                try:
+                    # Count a batch only once Qdrant has accepted it
+                    apply_delta(db, product_id, delta)
+                except Exception as e:
+                    db.rollback()
+                    upload_errors.append(e)
+        finally:
+            db.close()
+
+    uploaders = [
+        threading.Thread(target=upload_worker, name=f"qdrant-upload-{i}", daemon=True)
+        for i in range(workers)
+    ]
+    for uploader in uploaders:
+        uploader.start()
+
+    seen = 0
+    stored = 0
+    folded = {}
+    started = time.perf_counter()
+    try:
+        for batch in _batched(_valid_items(tqdm(items, desc="Processing Items")), BATCH_SIZE):
+            if upload_errors:
+                break
+            seen += len(batch)
+            payloads, delta, canonical_counts, indexed = _prepare_batch(batch, product_id, qdrant, incremental)
+            folded.update(canonical_counts)
+            if payloads:
+                try:
+                    points = qdrant.build_points(payloads)
+                except Exception:
+                    unfold_near_duplicates(product_id, indexed)
+                    raise
+                uploads.put((points, delta, indexed)) # Blocks while every uploader is busy and the queue is full
+                stored += len(points)
+            if watermarks is not None:
+                for item in batch:
+                    observe_watermarks(watermarks, item)
+    finally:
+        for _ in uploaders:
+            uploads.put(_DONE)
+        for uploader in uploaders:
+            uploader.join()
+
+    if upload_errors:
+        for indexed in unstored:
+            unfold_near_duplicates(product_id, indexed)
+        raise upload_errors[0]
+
+    if bulk and uploaded:
+        barrier_started = time.perf_counter()
+        qdrant.wait_for_updates(uploaded)
+        print(f"All bulk uploads applied ({time.perf_counter() - barrier_started:.2f}s barrier).")
+
+    if folded:
+        # After the barrier, so no pending upsert of a canonical point can overwrite its count
+        try:
+            qdrant.set_payloads({point_id: {"duplicate_count": count} for point_id, count in folded.items()})
+        except Exception as e:
+            print(f"Could not update duplicate counts on {len(folded)} points: {e}")
+
+    elapsed = time.perf_counter() - started
+    print(f"Successfully upserted {stored} of {seen} items.")
+    if stored:
+        print(
+            f"Throughput: {stored / elapsed:.1f} points/sec end to end over {elapsed:.1f}s; "
+            f"{upload_seconds[0]:.1f}s spent in upload requests."
+        )
+    print(f"Embedding cache stats: {embedding_cache_stats()}")
+    return stored
+
+def _load_ingest_config(db: Session, product_id: int):
+    """Returns (product, config, query) for a product, or None when it has no scraper config."""
+    product = db.query(Product).filter(Product.id == product_id).first()
+    if not product or not product.config:
+        print(f"Error: Product or config not found for product_id: {product_id}")
+        return None
+    config = product.config
+    # Use search_query if available, otherwise default to product name
+    query = str(config.search_query or product.name) # Ensure query is string
+    return product, config, query
 
-        if (len(payloads_to_upsert) == BATCH_SIZE) or (i == total_items - 1):
-            if payloads_to_upsert:
-                print(f"\nUpserting batch {len(payloads_to_upsert)} items...")
-                qdrant.upsert_many_feedbacks(payloads_to_upsert)
-                payloads_to_upsert.clear()
+def _source_names(config) -> list:
+    """The sources _build_scrape_jobs would run for this config, without importing the scrapers."""
+    names = []
+    if config.youtube_keywords:
+        names.append("YouTube")
+    if config.reddit_subreddits:
+        names.append("Reddit")
+    names.append("Google Search")
+    return names
 
-    print(f"Successfully upserted all items.")
+# Ingestion runs as a Celery canvas:
+#   run_full_ingest_task -> chord(group(scrape_source_task per source), fan_out_embed_task)
+#   fan_out_embed_task   -> chord(group(embed_chunk_task per INGEST_CHUNK_SIZE items), finalize_ingest_task)
+#                           (ingest_failed_task instead of finalize if any chunk fails)
+# Scrapes run on the "io" queue and embedding on the "cpu" queue (see task_routes in
+# celery_app.py), so each pool is sized for its work. Items are staged in Redis lists
+# (stage_store); messages and results only carry list keys, offsets and counts.
 
 @celery.task
-def run_full_ingest_task(product_id: int):
-    print(f"--- Starting background ingestion task for product_id: {product_id} ---")
+def run_full_ingest_task(product_id: int, incremental: bool = False):
+    """Plans an ingestion run and launches its canvas. Returns the run id."""
+    mode = "incremental" if incremental else "full"
+    print(f"--- Starting background {mode} ingestion for product_id: {product_id} ---")
     db: Session = SessionLocal()
-    qdrant_client = QdrantDB()
+    try:
+        loaded = _load_ingest_config(db, product_id)
+        if loaded is None:
+            return None
+        product, config, query = loaded
+        product_name = product.name
+        sources = _source_names(config)
+    finally:
+        db.close()
+
+    run_id = uuid.uuid4().hex
+    print(f"--- Ingest run {run_id} for '{product_name}' using query '{query}': scraping {', '.join(sources)} ---")
+    chord(
+        group(scrape_source_task.s(product_id, source, run_id, incremental) for source in sources)
+    )(fan_out_embed_task.s(product_id, run_id, incremental))
+    return run_id
 
+@celery.task
+def scrape_source_task(product_id: int, source: str, run_id: str, incremental: bool = False) -> dict:
+    """
+    Scrapes one source into a Redis stage list. Returns a reference to it with the item count
+    and the newest `created_at` per watermark key, applied only once the whole run has stored.
+    """
+    db: Session = SessionLocal()
     try:
-        product = db.query(Product).filter(Product.id == product_id).first()
-        if not product or not product.config:
-            print(f"Error: Product or config not found for product_id: {product_id}")
-            return
-
-        config = product.config
-        all_feedback = []
-        # Use search_query if available, otherwise default to product name
-        query = str(config.search_query or product.name) # Ensure query is string
-
-        print(f"--- Starting Data Collection Phase for '{product.name}' using query: '{query}' ---")
-
-        # --- SCRAPE YOUTUBE ---
-        if config.youtube_keywords:
-            print("--- Scraping YouTube ---")
-            all_feedback.extend(
-                scrape_youtube(
-                    query=query,
-                    keywords=config.youtube_keywords,
-                    max_videos=15 # Reduced from 30 for faster testing, adjust as needed
-                )
-            )
-
-        # --- SCRAPE REDDIT ---
-        if config.reddit_subreddits:
-            print("--- Scraping Reddit ---")
-            all_feedback.extend(
-                scrape_reddit(
-                    search_queries=[query],
-                    subreddits=config.reddit_subreddits,
-                    limit=50
-                )
-            )
-
-        # --- SCRAPE GOOGLE SEARCH ---
-        print("--- Scraping Google Search Results (via SerpApi) ---")
-        all_feedback.extend(
-            scrape_google_search(
-                query=query,
-                limit=10 # Get top 10 results
-            )
-        )
-        print(f"\n--- Data Collection Complete: Found {len(all_feedback)} total items from all sources ---")
-        if all_feedback:
-            process_and_store(all_feedback, product_id, qdrant_client)
-        else:
-            print("No feedback items collected from any source.")
+        loaded = _load_ingest_config(db, product_id)
+        if loaded is None:
+            return {"source": source, "key": None, "count": 0, "newest": {}}
+        _, config, query = loaded
+        watermarks = load_watermarks(db, product_id) if incremental else {}
+    finally:
+        db.close()
+
+    job = _build_scrape_jobs(config, query, watermarks, product_id).get(source)
+    key = stage_key(run_id, source)
+    newest = {}
+
+    def observed(items):
+        for item in _valid_items(items):
+            observe_watermarks(newest, item)
+            yield item
+
+    # stream_feedback keeps the per-source timeout; a failed source stages what it collected
+    count = write_items(key, observed(stream_feedback({source: job}, max_workers=1))) if job else 0
+    print(f"--- {source}: staged {count} items for run {run_id}; API usage today: {quota_usage(product_id)} ---")
+    return {"source": source, "key": key if count else None, "count": count, "newest": newest}
+
+@celery.task
+def fan_out_embed_task(scraped: list, product_id: int, run_id: str, incremental: bool = False):
+    """Chord callback of the scrape group: splits the staged items into embed chunks."""
+    newest = {}
+    for result in scraped:
+        for key, created_at in result["newest"].items():
+            if created_at > newest.get(key, ""):
+                newest[key] = created_at
+
+    chunks = [
+        embed_chunk_task.s(product_id, result["key"], start, min(start + INGEST_CHUNK_SIZE, result["count"]), incremental)
+        for result in scraped if result["key"]
+        for start in range(0, result["count"], INGEST_CHUNK_SIZE)
+    ]
+    keys = [result["key"] for result in scraped if result["key"]]
+    total = sum(result["count"] for result in scraped)
+    print(f"--- Run {run_id}: {total} items scraped, embedding in {len(chunks)} chunks ---")
+
+    finalize = finalize_ingest_task.s(product_id, run_id, newest, keys)
+    if not chunks:
+        finalize.delay([])
+        return
+    chord(group(chunks))(finalize.on_error(ingest_failed_task.s(product_id, run_id)))
 
-        print(f"\n Ingestion task for product {product_id} finished successfully.")
+@celery.task
+def embed_chunk_task(product_id: int, key: str, start: int, stop: int, incremental: bool = False) -> int:
+    """Runs one slice of a stage list through sentiment -> embedding -> upload. Returns items stored."""
+    return process_and_store(iter_items(key, start, stop), product_id, QdrantDB(), incremental=incremental)
+
+@celery.task
+def finalize_ingest_task(stored_per_chunk: list, product_id: int, run_id: str, newest: dict, keys: list):
+    """Runs once every chunk has stored: invalidates cached answers, advances watermarks, drops the stages."""
+    stored = sum(stored_per_chunk)
+    if stored == 0:
+        print("No new feedback items to store from any source.")
+    else:
+        # New data invalidates answers cached against the previous corpus
+        bump_corpus_version(product_id)
+
+    db: Session = SessionLocal()
+    try:
+        # Everything collected is now stored (or unchanged), so later runs can start from here
+        advance_watermarks(db, product_id, newest)
+    finally:
+        db.close()
+    delete_stages(keys)
+    print(f"\n Ingest run {run_id} for product {product_id} finished: {stored} items stored.")
 
+@celery.task
+def ingest_failed_task(request, exc, traceback, product_id: int, run_id: str):
+    """
+    Error callback of the embed chord, run instead of finalize_ingest_task when a chunk fails.
+    Chunks that did store are already searchable, so cached answers are invalidated all the
+    same; watermarks stay put so the next run scrapes the failed items again, and the stages
+    are left to expire.
+    """
+    print(f"\n Ingest run {run_id} for product {product_id} failed: {exc}")
+    bump_corpus_version(product_id)
+
+@celery.task
+def backfill_sentiment_task(product_id: int | None = None):
+    """
+    Scores points ingested before sentiment was stored with them, so the answer path can
+    rely on `sentiment_label` / `sentiment_compound` instead of running VADER per question.
+    """
+    scope = f"product {product_id}" if product_id is not None else "all products"
+    print(f"--- Starting sentiment backfill for {scope} ---")
+    qdrant_client = QdrantDB()
+    updated = 0
+    touched = set() # Products whose points were labelled
+
+    try:
+        for records in qdrant_client.iter_points_missing_sentiment(product_id):
+            texts = [(record.payload or {}).get("content") or "" for record in records]
+            touched.update((record.payload or {}).get("product_id") for record in records)
+            results = analyze_sentiment_batch(texts)
+            qdrant_client.set_payloads({
+                str(record.id): {
+                    "sentiment_label": result.get("label", "neutral"),
+                    "sentiment_compound": result.get("compound", 0.0)
+                }
+                for record, result in zip(records, results)
+            })
+            updated += len(records)
+            print(f"Backfilled sentiment for {updated} points so far...")
+
+        print(f"\n Sentiment backfill for {scope} finished. Updated {updated} points.")
+        # Backfilled points were never counted, so recount each affected product from Qdrant
+        db: Session = SessionLocal()
+        try:
+            for touched_id in sorted(pid for pid in touched if pid is not None):
+                bump_corpus_version(touched_id)
+                print(f"Rebuilt sentiment stats for product {touched_id}: {rebuild_stats(db, qdrant_client, touched_id)}")
+        finally:
+            db.close()
     except Exception as e:
-        # Add broader error catching for the whole task
-        print(f" CRITICAL ERROR during ingestion task for product {product_id}: {e}")
+        print(f" CRITICAL ERROR during sentiment backfill for {scope}: {e}")
         import traceback
         traceback.print_exc()
-    finally:
-        db.close()
\ No newline at end of file
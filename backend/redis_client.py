@@ -0,0 +1,20 @@
+import os
+import threading
+
+# Celery already requires Redis as its broker, so the app's own caches share that server by default
+REDIS_URL = os.getenv("REDIS_URL") or os.getenv("CELERY_BROKER_URL")
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_redis():
+    """Process-wide Redis client, or None when Redis is not configured."""
+    global _client
+    if not REDIS_URL:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+                _client = redis.Redis.from_url(REDIS_URL, socket_timeout=5, socket_connect_timeout=5)
+    return _client
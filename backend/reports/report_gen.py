@@ -1,19 +1,47 @@
 import os
 import traceback
 from datetime import datetime
-from fpdf import FPDF
+from celery.signals import worker_init, worker_process_init
 
+from backend.db.database import SessionLocal
 from backend.llm.engine import InsightEngine
+from backend.pipeline.stats import get_product_stats
+from backend.pipeline.embeddings import warm_query_cache_in_background
 from backend.reports.email_sender import send_email
+from backend.reports.sections import REPORT_SECTIONS
 from backend.celery_app import celery
 
 
-class PDF(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, 'InsightGenie Summary Report', 0, 1, 'C')
-        self.ln(10)
+def _make_pdf():
+    # fpdf is imported on first report rather than when the worker loads its task modules
+    from fpdf import FPDF
+
+    class PDF(FPDF):
+        def header(self):
+            self.set_font('Arial', 'B', 12)
+            self.cell(0, 10, 'InsightGenie Summary Report', 0, 1, 'C')
+            self.ln(10)
+
+    return PDF()
         
+def _is_prefork(worker) -> bool:
+    pool_cls = getattr(worker, "pool_cls", None)
+    name = pool_cls if isinstance(pool_cls, str) else getattr(pool_cls, "__module__", "")
+    return "prefork" in (name or "")
+
+@worker_init.connect
+def warm_report_query_embeddings_in_worker(sender=None, **kwargs):
+    """Warm-up for pools without child processes (gevent, solo). A prefork parent must not load
+    the model: children forked while it holds the backend lock or the cache's SQLite handle
+    inherit them and hang. Its children warm up on worker_process_init instead."""
+    if not _is_prefork(sender):
+        warm_query_cache_in_background(REPORT_SECTIONS.values())
+
+@worker_process_init.connect
+def warm_report_query_embeddings(**kwargs):
+    """Pre-embeds the fixed section questions so reports never pay for query encoding."""
+    warm_query_cache_in_background(REPORT_SECTIONS.values())
+
 @celery.task
 def generate_and_email_report_task(product_id: int, recipient_email: str, product_name: str):
     print(f"Starting PDF report generation for product: {product_name} (ID: {product_id})...")
@@ -21,36 +49,33 @@ def generate_and_email_report_task(product_id: int, recipient_email: str, produc
     
     try:
         engine = InsightEngine()
-        report_sections = {
-            "Overall Summary": "Provide a brief, high-level summary of the overall customer sentiment.",
-            "Positive Themes (Pros)": "What are the most common positive themes or pros mentioned in the feedback? Use bullet points.",
-            "Negative Themes (Cons & Criticisms)": "What are the most common negative themes, criticisms, or cons? Use bullet points.",
-            "Feature Requests & Suggestions": "Are there any specific feature requests or suggestions for improvement? List them out. If none, state 'No specific feature requests found'." # Slightly updated question
-        }
+        report_sections = REPORT_SECTIONS
         
+        db = SessionLocal()
+        try:
+            corpus_stats = get_product_stats(db, product_id)
+        finally:
+            db.close()
+
         report_content = {}
-        total_sections = len(report_sections)
+        print(f"\n--- Generating {len(report_sections)} Report Sections concurrently ---")
+
+        try:
+            # One batched retrieval for all sections, then concurrent LLM calls; answers keep section order
+            answers = engine.answer_questions(list(report_sections.values()), product_id, product_name, corpus_stats)
+        except Exception as e:
+            print(f"CRITICAL ERROR: AI generation failed for the report sections")
+            traceback.print_exc()
+            answers = [f"**Error: Report generation failed for this section.**\n{e}"] * len(report_sections)
 
-        for i, (key, question) in enumerate(report_sections.items()):
-            print(f"\n--- Generating Report Section ({i+1}/{total_sections}): {key} ---")
-            
-            try:
-                # --- PASS product_name HERE ---
-                full_response = "".join(engine.answer_question(question, product_id, product_name)) 
-                
-                if not full_response or not full_response.strip():
-                    print(f"WARNING: AI returned an empty response for section: {key}")
-                    full_response = "*No specific data was returned for this section based on the available feedback.*"
-                
-                report_content[key] = full_response
-            
-            except Exception as e:
-                print(f"CRITICAL ERROR: AI generation failed for section: {key}")
-                traceback.print_exc()
-                report_content[key] = f"**Error: Report generation failed for this section.**\n{e}"
+        for key, full_response in zip(report_sections, answers):
+            if not full_response or not full_response.strip():
+                print(f"WARNING: AI returned an empty response for section: {key}")
+                full_response = "*No specific data was returned for this section based on the available feedback.*"
+            report_content[key] = full_response
         
         # --- PDF Generation ---
-        pdf = PDF()
+        pdf = _make_pdf()
         pdf.add_font("Arial", "", r"C:\Windows\Fonts\arial.ttf")
         pdf.add_font("Arial", "B", r"C:\Windows\Fonts\arialbd.ttf")
         pdf.add_page()
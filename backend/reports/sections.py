@@ -0,0 +1,8 @@
+# Fixed questions asked for every product report, in the order the sections are rendered.
+# Kept free of heavy imports so the API and workers can warm the query-embedding cache with them.
+REPORT_SECTIONS = {
+    "Overall Summary": "Provide a brief, high-level summary of the overall customer sentiment.",
+    "Positive Themes (Pros)": "What are the most common positive themes or pros mentioned in the feedback? Use bullet points.",
+    "Negative Themes (Cons & Criticisms)": "What are the most common negative themes, criticisms, or cons? Use bullet points.",
+    "Feature Requests & Suggestions": "Are there any specific feature requests or suggestions for improvement? List them out. If none, state 'No specific feature requests found'." # Slightly updated question
+}
@@ -2,36 +2,56 @@ import os
 from serpapi import GoogleSearch
 from datetime import datetime
 from dotenv import load_dotenv
+
+from backend.scrapers.rate_limit import spend
+from backend.scrapers.response_cache import cached_call, replaying
+
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 
-def scrape_google_search(query: str, limit: int = 10):
+def scrape_google_search(query: str, limit: int = 10, product_id: int | None = None):
     """
     Uses SerpApi to get top Google Search results for a query.
     Returns a list of dictionaries containing title, link, and snippet.
     """
+    return list(iter_google_search(query, limit, product_id))
+
+def iter_google_search(query: str, limit: int = 10, product_id: int | None = None):
+    """Yields the top Google Search results for a query (see scrape_google_search).
+    Responses come from the scraper response cache when fresh; only real searches count against
+    the shared SerpApi rate limit and daily budget."""
     print(f"🔍 Getting top {limit} Google Search results via SerpApi for query: '{query}'...")
 
-    if not SERPAPI_API_KEY:
+    if not SERPAPI_API_KEY and not replaying():
         print("❌ SerpApi API key missing in .env file. Skipping Google Search scraping.")
-        return []
+        return
 
-    collected_results = []
+    collected = 0
     try:
         params = {
           "q": query,
-          "api_key": SERPAPI_API_KEY,
           "num": limit # Number of results to return
         }
 
-        search = GoogleSearch(params)
-        results_data = search.get_dict()
+        def fetch():
+            if not spend("serpapi", 1, product_id):
+                return None
+            response = GoogleSearch({**params, "api_key": SERPAPI_API_KEY}).get_dict()
+            if "error" in response: # Not cached, so the next run tries again
+                print(f"❌ SerpApi returned an error: {response['error']}")
+                return None
+            return response
+
+        results_data = cached_call("serpapi", params, fetch)
+        if results_data is None:
+            print("⚠️ No SerpApi response (budget exhausted, rate limited, error or nothing recorded). Skipping Google Search scraping.")
+            return
 
         organic_results = results_data.get("organic_results", [])
 
         if not organic_results:
             print("⚠️ No organic results found by SerpApi.")
-            return []
+            return
 
         print(f"✅ Found {len(organic_results)} organic results from SerpApi.")
 
@@ -40,19 +60,19 @@ def scrape_google_search(query: str, limit: int = 10):
             if not link: # Skip results without a link
                 continue
 
-            collected_results.append({
+            collected += 1
+            yield {
                 "source": "Google Search Result", # Source identifier
                 "source_id": link, # Use the URL as a unique ID
                 "content": f"{result.get('title', '')}\n{result.get('snippet', '')}".strip(), # Combine title and snippet
                 "created_at": None # Search results don't have a creation date
-            })
+            }
 
     except Exception as e:
         print(f"❌ Google Search scraping via SerpApi failed: {e}")
-        return []
+        return
 
-    print(f"✅ Google Search scraping complete. Collected {len(collected_results)} results.")
-    return collected_results
+    print(f"✅ Google Search scraping complete. Collected {collected} results.")
 
 # Example usage (for testing this script directly)
 if __name__ == '__main__':
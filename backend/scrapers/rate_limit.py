@@ -0,0 +1,173 @@
+import os
+import time
+import threading
+from datetime import datetime, timezone
+
+from backend.redis_client import get_redis
+
+# Per-source request rates and daily quotas, shared by every worker through Redis.
+# The rate limit counts HTTP requests; the daily quota is counted in the source's own units:
+# YouTube API units (search.list = 100, commentThreads.list = 1) and SerpApi searches.
+# Reddit has no daily quota, only a request rate.
+SOURCE_LIMITS = {
+    "youtube": {
+        "per_minute": float(os.getenv("SCRAPER_RATE_YOUTUBE", 300)),
+        "burst": int(os.getenv("SCRAPER_BURST_YOUTUBE", 20)),
+        "daily_quota": int(os.getenv("YOUTUBE_DAILY_QUOTA", 10_000)),
+    },
+    "reddit": {
+        "per_minute": float(os.getenv("SCRAPER_RATE_REDDIT", 60)),
+        "burst": int(os.getenv("SCRAPER_BURST_REDDIT", 10)),
+        "daily_quota": None,
+    },
+    "serpapi": {
+        "per_minute": float(os.getenv("SCRAPER_RATE_SERPAPI", 30)),
+        "burst": int(os.getenv("SCRAPER_BURST_SERPAPI", 5)),
+        "daily_quota": int(os.getenv("SERPAPI_DAILY_SEARCHES", 100)),
+    },
+}
+class QuotaExhausted(RuntimeError):
+    """Raised by scrapers that cannot return early when spend() refuses a request; ends the whole scrape."""
+
+RATE_LIMIT_MAX_WAIT = float(os.getenv("SCRAPER_RATE_LIMIT_MAX_WAIT", 120)) # Seconds a call may wait for a token
+PRODUCT_QUOTA_SHARE = float(os.getenv("SCRAPER_PRODUCT_QUOTA_SHARE", 0.25)) # Of a day's quota, per product
+
+# Token bucket refilled continuously at `rate` tokens/sec up to `capacity`. Returns "0" when
+# the tokens were taken, otherwise the seconds until enough will have refilled (nothing taken).
+_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+_script = None
+_script_lock = threading.Lock()
+
+def _bucket_key(source: str) -> str:
+    return f"insightgenie:ratelimit:{source}"
+
+def _quota_key(source: str) -> str:
+    # Counted per UTC day (YouTube's own quota resets at midnight Pacific time)
+    return f"insightgenie:quota:{source}:{datetime.now(timezone.utc):%Y%m%d}"
+
+def _usage_key(source: str) -> str:
+    return f"insightgenie:quota_usage:{source}:{datetime.now(timezone.utc):%Y%m%d}" # product id -> units
+
+def _get_script(client):
+    global _script
+    if _script is None:
+        with _script_lock:
+            if _script is None:
+                _script = client.register_script(_TOKEN_BUCKET)
+    return _script
+
+def _wait_for_token(client, source: str, max_wait: float) -> bool:
+    """Takes one request token; every caller uses the same capacity, so none can clamp another."""
+    limits = SOURCE_LIMITS[source]
+    rate = limits["per_minute"] / 60
+    deadline = time.monotonic() + max_wait
+    while True:
+        wait = float(_get_script(client)(keys=[_bucket_key(source)], args=[rate, limits["burst"], 1]))
+        if wait <= 0:
+            return True
+        if time.monotonic() + wait > deadline:
+            print(f"Rate limit for {source}: would wait {wait:.1f}s, over the {max_wait:.0f}s limit.")
+            return False
+        time.sleep(wait)
+
+def spend(source: str, units: int = 1, product_id: int | None = None, max_wait: float = RATE_LIMIT_MAX_WAIT) -> bool:
+    """
+    Call before each API request. Reserves `units` of the source's daily quota and waits for
+    one rate-limit token (a request is one token whatever its quota cost), charging the units
+    to `product_id`. Returns False (and reserves
+    nothing) when the quota is used up or the wait would exceed `max_wait`; the caller should
+    stop and keep what it has. Without Redis, requests are not limited.
+    """
+    client = get_redis()
+    if client is None:
+        return True
+    try:
+        quota = SOURCE_LIMITS[source]["daily_quota"]
+        if quota is not None:
+            used = client.incrby(_quota_key(source), units)
+            client.expire(_quota_key(source), 2 * 86400)
+            if used > quota:
+                client.decrby(_quota_key(source), units)
+                print(f"Daily {source} quota of {quota} units is used up.")
+                return False
+
+        if not _wait_for_token(client, source, max_wait):
+            if quota is not None:
+                client.decrby(_quota_key(source), units)
+            return False
+
+        if product_id is not None:
+            pipe = client.pipeline()
+            pipe.hincrby(_usage_key(source), str(product_id), units)
+            pipe.expire(_usage_key(source), 2 * 86400)
+            pipe.execute()
+        return True
+    except Exception as e:
+        print(f"Rate limiter unavailable for {source}, continuing without it: {e}")
+        return True
+
+def exhaust_quota(source: str):
+    """Marks today's quota as used up, e.g. after the API itself reported it exceeded."""
+    client = get_redis()
+    quota = SOURCE_LIMITS[source]["daily_quota"]
+    if client is None or quota is None:
+        return
+    try:
+        client.set(_quota_key(source), quota, ex=2 * 86400)
+    except Exception as e:
+        print(f"Could not record exhausted {source} quota: {e}")
+
+def remaining_quota(source: str) -> int | None:
+    """Units left today, or None for sources without a daily quota (or without Redis)."""
+    client = get_redis()
+    quota = SOURCE_LIMITS[source]["daily_quota"]
+    if client is None or quota is None:
+        return None
+    try:
+        return max(0, quota - int(client.get(_quota_key(source)) or 0))
+    except Exception:
+        return None
+
+def run_budget(source: str, product_id: int | None = None) -> int | None:
+    """
+    Units a scrape for `product_id` may spend now: what is left today, capped at the
+    product's PRODUCT_QUOTA_SHARE of the daily quota minus what it already used today.
+    """
+    remaining = remaining_quota(source)
+    if remaining is None or product_id is None:
+        return remaining
+    product_cap = int(SOURCE_LIMITS[source]["daily_quota"] * PRODUCT_QUOTA_SHARE)
+    return max(0, min(remaining, product_cap - quota_usage(product_id).get(source, 0)))
+
+def quota_usage(product_id: int) -> dict:
+    """Units each source has charged to a product today."""
+    client = get_redis()
+    if client is None:
+        return {}
+    try:
+        pipe = client.pipeline()
+        for source in SOURCE_LIMITS:
+            pipe.hget(_usage_key(source), str(product_id))
+        return {source: int(value) for source, value in zip(SOURCE_LIMITS, pipe.execute()) if value}
+    except Exception:
+        return {}
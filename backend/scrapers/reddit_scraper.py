@@ -2,8 +2,12 @@ import os
 import praw
 from datetime import datetime
 import prawcore
+import requests
 from dotenv import load_dotenv # <-- Add dotenv import
 
+from backend.scrapers.rate_limit import spend, QuotaExhausted
+from backend.scrapers.response_cache import cached_call, replaying, SCRAPER_CACHE_MODE
+
 # --- Load .env specifically within this script ---
 # Adjust path if .env is not in the parent 'backend' directory relative to 'scrapers'
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
@@ -15,28 +19,93 @@ REDDIT_CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
 REDDIT_CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
 REDDIT_USER_AGENT = os.getenv("REDDIT_USER_AGENT")
 
-def scrape_reddit(search_queries: list, subreddits: list, limit: int):
-    """Scrapes Reddit for posts matching search queries."""
+# Replayed rate-limit headers would make PRAW throttle against a window that is long gone
+_UNCACHED_HEADERS = {"x-ratelimit-remaining", "x-ratelimit-reset", "x-ratelimit-used",
+                     "set-cookie", "content-encoding", "content-length"}
+
+def _rebuild_response(stored: dict) -> requests.Response:
+    response = requests.Response()
+    response.status_code = stored["status"]
+    response.headers = requests.structures.CaseInsensitiveDict(stored["headers"])
+    response._content = stored["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = stored["url"]
+    response.reason = "OK"
+    return response
+
+class RateLimitedRequestor(prawcore.Requestor):
+    """
+    Serves GET requests PRAW makes through the scraper response cache and takes a token from
+    the shared Reddit rate limiter before every request that reaches the network. In record and
+    replay modes the OAuth token request is stored too, so a replayed run needs no network.
+    """
+
+    def __init__(self, *args, product_id: int | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.product_id = product_id
+
+    def _fetch(self, *args, **kwargs):
+        if not spend("reddit", 1, self.product_id):
+            raise QuotaExhausted("Reddit rate limit budget exceeded; stopping the Reddit scrape.")
+        return super().request(*args, **kwargs)
+
+    def request(self, method, url, *args, **kwargs):
+        if method.upper() != "GET" and SCRAPER_CACHE_MODE not in ("record", "replay"):
+            return self._fetch(method, url, *args, **kwargs)
+
+        live = {}
+        def fetch():
+            response = live["response"] = self._fetch(method, url, *args, **kwargs)
+            if response.status_code != 200: # Errors are passed to PRAW, never cached
+                return None
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in _UNCACHED_HEADERS}
+            return {"status": response.status_code, "headers": headers, "body": response.text, "url": response.url}
+
+        params = {"method": method.upper(), "url": url, "params": kwargs.get("params"), "data": kwargs.get("data")}
+        stored = cached_call("reddit", params, fetch)
+        if "response" in live:
+            return live["response"]
+        if stored is None:
+            raise RuntimeError(f"No recorded Reddit response for {method.upper()} {url}.")
+        return _rebuild_response(stored)
+
+def scrape_reddit(search_queries: list, subreddits: list, limit: int, since_by_subreddit: dict | None = None,
+                  product_id: int | None = None):
+    """Scrapes Reddit for posts matching search queries and returns them as a list."""
+    return list(iter_reddit_posts(search_queries, subreddits, limit, since_by_subreddit, product_id))
+
+def iter_reddit_posts(search_queries: list, subreddits: list, limit: int, since_by_subreddit: dict | None = None,
+                      product_id: int | None = None):
+    """
+    Yields Reddit posts matching search queries as they are fetched.
+    `since_by_subreddit` maps a subreddit to the `created_at` of the newest post already
+    ingested from it; results come newest-first, so collection stops once it is reached.
+    Requests share one rate limit across workers and are charged to `product_id`.
+    """
     print(" scraping Reddit...")
 
     # Print loaded creds (except secret) for debugging
     print(f"  Using Client ID: {REDDIT_CLIENT_ID}")
     print(f"  Using User Agent: {REDDIT_USER_AGENT}")
 
-    if not all([REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT]):
+    if not all([REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT]) and not replaying():
         print("Reddit API credentials missing or failed to load. Skipping Reddit scraping.")
-        return []
+        return
 
-    collected_posts = []
+    total_posts = 0
     reddit = None
+    since_by_subreddit = since_by_subreddit or {}
 
     try:
         # Explicitly pass credentials just in case
         reddit = praw.Reddit(
-            client_id=REDDIT_CLIENT_ID,
-            client_secret=REDDIT_CLIENT_SECRET,
-            user_agent=REDDIT_USER_AGENT,
-            read_only=True
+            # Replayed runs never authenticate for real, so placeholders will do
+            client_id=REDDIT_CLIENT_ID or "replay",
+            client_secret=REDDIT_CLIENT_SECRET or "replay",
+            user_agent=REDDIT_USER_AGENT or "insightgenie-replay",
+            read_only=True,
+            requestor_class=RateLimitedRequestor,
+            requestor_kwargs={"product_id": product_id}
         )
         print(f"Reddit API authenticated as: {reddit.user.me() or 'read-only'}")
 
@@ -48,19 +117,47 @@ def scrape_reddit(search_queries: list, subreddits: list, limit: int):
                     _ = subreddit.display_name # Force validation
                     print(f"Successfully accessed r/{subreddit_name}. Searching...")
 
-                    search_results = list(subreddit.search(query=query, limit=limit, sort='new'))
-                    print(f"--- Reddit Search for '{query}' in r/{subreddit_name} found {len(search_results)} results. ---")
+                    # Iterate the listing lazily so posts stream out page by page
+                    search_results = subreddit.search(query=query, limit=limit, sort='new')
+                    found = 0
 
+                    since = since_by_subreddit.get(subreddit_name)
+                    # With a watermark, posts are held until we know whether the scan reached it:
+                    # if `limit` cut it short, they are marked `partial_scan` so the watermark
+                    # stays put and the next run fetches the posts in between
+                    held = []
+                    scanned_to_known = False
                     for post in search_results:
+                        created_at = datetime.utcfromtimestamp(post.created_utc).isoformat()
+                        if since and created_at <= since:
+                            print(f"Reached already-ingested posts in r/{subreddit_name}. Stopping.")
+                            scanned_to_known = True
+                            break
                         full_text = post.title + " " + post.selftext
-                        collected_posts.append({
+                        found += 1
+                        item = {
                             "source": "Reddit",
                             "source_id": f"reddit_post_{post.id}",
+                            "subreddit": subreddit_name,
                             "content": full_text.strip(),
-                            "created_at": datetime.utcfromtimestamp(post.created_utc).isoformat()
-                        })
+                            "created_at": created_at
+                        }
+                        if since:
+                            held.append(item)
+                        else:
+                            yield item
+                    if held:
+                        if not scanned_to_known and found >= limit:
+                            print(f"Hit the {limit}-post limit before reaching already-ingested posts in r/{subreddit_name}.")
+                            for item in held:
+                                item["partial_scan"] = True
+                        yield from held
+                    total_posts += found
+                    print(f"--- Reddit Search for '{query}' in r/{subreddit_name} found {found} results. ---")
 
                 # Specific error handling
+                except QuotaExhausted:
+                    raise # Every further subreddit would wait on the limiter and fail the same way
                 except prawcore.exceptions.NotFound:
                     print(f"❌ ERROR: Subreddit 'r/{subreddit_name}' not found (404). Skipping.")
                     continue
@@ -74,20 +171,18 @@ def scrape_reddit(search_queries: list, subreddits: list, limit: int):
                      print(f"❌ ERROR: Failed processing subreddit 'r/{subreddit_name}': {sub_e}")
                      continue
 
-        print(f"\nReddit scraping complete. Found {len(collected_posts)} total posts.")
-        return collected_posts
+        print(f"\nReddit scraping complete. Found {total_posts} total posts.")
 
+    except QuotaExhausted as quota_e:
+        print(f"⚠️ {quota_e} Collected {total_posts} posts before that.")
     # Catch potential authentication errors
     except prawcore.exceptions.OAuthException as auth_e:
         print(f"❌ Reddit Authentication Failed: {auth_e}. Check credentials.")
-        return []
     except prawcore.exceptions.ResponseException as resp_e:
         # Catch other potential HTTP errors like 403 Forbidden here
         print(f"❌ Reddit API Request Failed: {resp_e}")
         print(f"   Response details: {resp_e.response}") # Log more details if available
-        return []
     except Exception as e:
         print(f"❌ Reddit scraping failed unexpectedly: {e}")
         import traceback
-        traceback.print_exc()
-        return []
\ No newline at end of file
+        traceback.print_exc()
\ No newline at end of file
@@ -0,0 +1,178 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+
+# off:    every call goes to the network
+# cache:  responses are reused until their source's TTL expires (default)
+# record: every call goes to the network and its response is stored, whatever the TTL
+# replay: calls are served only from stored responses, never the network; a miss returns
+#         nothing, so an ingest can be re-run offline against recorded fixtures
+SCRAPER_CACHE_MODE = os.getenv("SCRAPER_CACHE_MODE", "cache").lower()
+SCRAPER_CACHE_PATH = os.getenv(
+    "SCRAPER_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), '..', '.cache', 'scraper_responses.sqlite3')
+)
+SCRAPER_CACHE_MAX_BYTES = int(float(os.getenv("SCRAPER_CACHE_MAX_MB", 200)) * 1024 * 1024)
+
+# Seconds a response stays fresh per endpoint. Comment and post listings change fastest.
+SOURCE_TTLS = {
+    "serpapi": int(os.getenv("SCRAPER_CACHE_TTL_SERPAPI", 24 * 3600)),
+    "youtube_search": int(os.getenv("SCRAPER_CACHE_TTL_YOUTUBE_SEARCH", 12 * 3600)),
+    "youtube_comments": int(os.getenv("SCRAPER_CACHE_TTL_YOUTUBE_COMMENTS", 3600)),
+    "reddit": int(os.getenv("SCRAPER_CACHE_TTL_REDDIT", 3600)),
+}
+
+# Credentials never become part of a key, so recorded fixtures work with any key
+_SECRET_PARAMS = {"api_key", "key", "developerkey", "client_secret", "access_token"}
+
+def _normalize(value):
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items()) if str(k).lower() not in _SECRET_PARAMS}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+def request_key(source: str, params: dict) -> str:
+    """Stable key for a request: source plus its parameters, sorted, whitespace-normalized and without secrets."""
+    canonical = json.dumps(_normalize(params), sort_keys=True, default=str)
+    return f"{source}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+class ResponseCache:
+    """
+    SQLite store of JSON-serializable API responses keyed by request_key. Entries older than
+    their source's TTL are ignored (except in replay mode); once the stored responses exceed
+    `max_bytes` the oldest are deleted. Safe to share between threads.
+    """
+
+    def __init__(self, path: str = SCRAPER_CACHE_PATH, max_bytes: int = SCRAPER_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, source TEXT NOT NULL, body TEXT NOT NULL,"
+            " size INTEGER NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_stored ON responses (stored_at)")
+        self._conn.commit()
+
+    def contains(self, key: str, ttl: float | None) -> bool:
+        """Whether get() would return a response, without reading it or counting a lookup."""
+        with self._lock:
+            row = self._conn.execute("SELECT stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+        return row is not None and (ttl is None or time.time() - row[0] <= ttl)
+
+    def get(self, key: str, ttl: float | None):
+        """The stored response, or None if missing or older than `ttl` seconds (None = any age)."""
+        with self._lock:
+            row = self._conn.execute("SELECT body, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (ttl is not None and time.time() - row[1] > ttl):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, source: str, response):
+        body = json.dumps(response)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, source, body, size, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (key, source, body, len(body), time.time())
+            )
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= 100:
+                self._writes_since_prune = 0
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self):
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total <= self.max_bytes:
+            return
+        freed, removed = 0, []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY stored_at ASC"):
+            if total - freed <= self.max_bytes * 0.9: # Free a margin so pruning doesn't run on every write
+                break
+            removed.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", removed)
+        print(f"Scraper response cache pruned {len(removed)} oldest responses ({freed / 1e6:.1f} MB).")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "mode": SCRAPER_CACHE_MODE,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Process-wide cache instance, or None when the mode is off or the store cannot be opened."""
+    global _cache
+    if SCRAPER_CACHE_MODE == "off":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = ResponseCache()
+                except Exception as e:
+                    print(f"Scraper response cache unavailable, calling APIs directly: {e}")
+                    return None
+    return _cache
+
+def replaying() -> bool:
+    return SCRAPER_CACHE_MODE == "replay"
+
+def will_serve(source: str, params: dict) -> bool:
+    """Whether cached_call would answer `params` without calling the API (so spend no quota)."""
+    cache = get_response_cache()
+    if cache is None or SCRAPER_CACHE_MODE not in ("cache", "replay"):
+        return False
+    return cache.contains(request_key(source, params), None if replaying() else SOURCE_TTLS.get(source, 3600))
+
+def cached_call(source: str, params: dict, fetch):
+    """
+    Returns the response for `params` from the cache when allowed by the mode and the source's
+    TTL; otherwise calls `fetch()` and stores its result. A `fetch` returning None (e.g. no
+    quota left) is not cached. In replay mode `fetch` is never called and a miss returns None.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return fetch()
+
+    key = request_key(source, params)
+    if SCRAPER_CACHE_MODE in ("cache", "replay"):
+        cached = cache.get(key, None if replaying() else SOURCE_TTLS.get(source, 3600))
+        if cached is not None or replaying():
+            if cached is None:
+                print(f"Replay: no recorded {source} response for {params}.")
+            return cached
+
+    response = fetch()
+    if response is not None:
+        try:
+            cache.put(key, source, response)
+        except Exception as e:
+            print(f"Could not store {source} response in cache: {e}")
+    return response
+
+def response_cache_stats() -> dict:
+    cache = get_response_cache()
+    return cache.stats() if cache else {"mode": SCRAPER_CACHE_MODE}
@@ -1,76 +1,221 @@
 import os
-import googleapiclient.discovery
-from youtube_transcript_api import YouTubeTranscriptApi
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from backend.scrapers.rate_limit import spend, exhaust_quota, run_budget
+from backend.scrapers.response_cache import cached_call, replaying, will_serve
+
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+YOUTUBE_MAX_CONCURRENT_VIDEOS = int(os.getenv("YOUTUBE_MAX_CONCURRENT_VIDEOS", 4))
+YOUTUBE_MAX_PAGES_PER_VIDEO = int(os.getenv("YOUTUBE_MAX_PAGES_PER_VIDEO", 10)) # 100 comments per page
+SEARCH_COST = 100 # Quota units per search.list call
+PAGE_COST = 1 # Quota units per commentThreads.list page
+
+# The discovery client wraps httplib2, which is not thread-safe, so each worker thread builds its own.
+_thread_local = threading.local()
 
-def _get_video_ids(youtube, query: str, max_results: int):
-    """Finds the top video IDs for a given search query."""
-    request = youtube.search().list(
-        part="snippet",
-        q=query,
-        type="video",
-        order="relevance",
-        maxResults=max_results
+def _build_client():
+    import googleapiclient.discovery # Heavy import, only needed once a scrape actually runs
+    return googleapiclient.discovery.build(
+        "youtube", "v3", developerKey=YOUTUBE_API_KEY
     )
-    response = request.execute()
+
+def _get_thread_client():
+    if not hasattr(_thread_local, "youtube"):
+        _thread_local.youtube = _build_client()
+    return _thread_local.youtube
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parses YouTube's ISO 8601 timestamps (e.g. 2024-05-01T10:00:00Z)."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def _is_quota_error(error: Exception) -> bool:
+    return "quotaExceeded" in str(error) or "dailyLimitExceeded" in str(error)
+
+def _plan_quota(max_videos: int, max_pages_per_video: int, product_id: int | None, search_cost: int = SEARCH_COST):
+    """
+    Shrinks max_videos / max_pages_per_video to what the product may still spend today, so a
+    run covers fewer videos completely instead of failing halfway. `search_cost` is 0 when the
+    search will be served from the response cache. Returns (videos, pages).
+    """
+    budget = run_budget("youtube", product_id)
+    if budget is None:
+        return max_videos, max_pages_per_video
+    page_budget = budget - search_cost
+    if page_budget < PAGE_COST:
+        return 0, 0
+    if max_videos * max_pages_per_video * PAGE_COST <= page_budget:
+        return max_videos, max_pages_per_video
+    videos = min(max_videos, page_budget // PAGE_COST)
+    pages = max(1, min(max_pages_per_video, page_budget // (videos * PAGE_COST)))
+    print(f"YouTube quota budget {budget} units: scraping {videos} videos x {pages} pages "
+          f"instead of {max_videos} x {max_pages_per_video}.")
+    return videos, pages
+
+def _execute(source: str, params: dict, cost: int, product_id: int | None, make_request):
+    """
+    Runs one API call through the scraper response cache. Only a real call spends `cost` quota
+    units; returns None when the budget is exhausted (or, in replay mode, nothing was recorded).
+    """
+    def fetch():
+        if not spend("youtube", cost, product_id):
+            return None
+        return make_request(_get_thread_client())(**params).execute()
+    return cached_call(source, params, fetch)
+
+def _search_params(query: str, max_results: int) -> dict:
+    return {
+        "part": "snippet",
+        "q": query,
+        "type": "video",
+        "order": "relevance",
+        "maxResults": max_results
+    }
+
+def _get_video_ids(query: str, max_results: int, product_id: int | None = None):
+    """Finds the top video IDs for a given search query, or None if the quota is spent."""
+    params = _search_params(query, max_results)
+    response = _execute("youtube_search", params, SEARCH_COST, product_id, lambda youtube: youtube.search().list)
+    if response is None:
+        return None
     return [item['id']['videoId'] for item in response.get('items', [])]
 
-def _get_comments(youtube, video_id: str, keywords: list):
-    """Fetches comments for a video that match specific keywords."""
+def _get_comment_page(video_id: str, page_token: str | None, product_id: int | None):
+    params = {
+        "part": "snippet",
+        "videoId": video_id,
+        "maxResults": 100,
+        "order": "time", # Newest first (the API default), which incremental paging relies on
+        "textFormat": "plainText"
+    }
+    if page_token:
+        params["pageToken"] = page_token
+    return _execute("youtube_comments", params, PAGE_COST, product_id, lambda youtube: youtube.commentThreads().list)
+
+def _get_comments(video_id: str, keywords: list, max_pages: int = YOUTUBE_MAX_PAGES_PER_VIDEO,
+                  since: str | None = None, product_id: int | None = None):
+    """
+    Fetches comments for a video that match specific keywords.
+    Reads at most `max_pages` pages. Comments arrive newest-first, so when `since` (an ISO
+    timestamp) is given, paging stops at the first comment published at or before it.
+    Each fetched page goes through the shared rate limiter; paging stops early once the quota is spent.
+    If paging stops before reaching `since`, the comments are marked `partial_scan` so the
+    video's watermark stays put and the next run picks up the comments in between.
+    """
     matching_comments = []
+    scanned_to_known = False
+    since_dt = _parse_timestamp(since) if since else None
     try:
-        request = youtube.commentThreads().list(
-            part="snippet",
-            videoId=video_id,
-            maxResults=100,
-            textFormat="plainText"
-        )
-        response = request.execute()
+        response = _get_comment_page(video_id, None, product_id)
+        pages_read = 1
 
         while response:
+            reached_known = False
             for item in response['items']:
                 comment = item['snippet']['topLevelComment']['snippet']
                 comment_text = comment['textDisplay']
-                
+
+                if since_dt and _parse_timestamp(comment['publishedAt']) <= since_dt:
+                    reached_known = True
+                    break
+
                 if not keywords or any(keyword.lower() in comment_text.lower() for keyword in keywords):
                     matching_comments.append({
                         "source": "YouTube Comment",
                         "source_id": f"yt_comment_{item['id']}",
+                        "video_id": video_id,
                         "content": comment_text,
                         "created_at": comment['publishedAt']
                     })
 
+            if reached_known:
+                scanned_to_known = True
+                break
+            if pages_read >= max_pages:
+                print(f"Reached page budget ({max_pages}) for video {video_id}.")
+                break
             if 'nextPageToken' in response:
-                request = youtube.commentThreads().list_next(request, response)
-                response = request.execute()
+                response = _get_comment_page(video_id, response['nextPageToken'], product_id)
+                if response is None:
+                    print(f"Stopping comments for video {video_id}: YouTube quota or rate budget exhausted.")
+                    break
+                pages_read += 1
             else:
+                scanned_to_known = True # Read every comment the video has
                 break
     except Exception as e:
+        if _is_quota_error(e):
+            exhaust_quota("youtube")
         print(f"Could not retrieve comments for video {video_id}: {e}")
-        
+
+    if since and not scanned_to_known:
+        for comment in matching_comments:
+            comment["partial_scan"] = True
     return matching_comments
 
-def scrape_youtube(query: str, keywords: list, max_videos: int = 10):
-    """Main function to scrape YouTube video comments."""
-    if not YOUTUBE_API_KEY:
+def scrape_youtube(query: str, keywords: list, max_videos: int = 10,
+                   max_concurrent_videos: int = YOUTUBE_MAX_CONCURRENT_VIDEOS,
+                   max_pages_per_video: int = YOUTUBE_MAX_PAGES_PER_VIDEO,
+                   since_by_video: dict | None = None, product_id: int | None = None):
+    """Main function to scrape YouTube video comments. Returns them as a list."""
+    return list(iter_youtube_comments(
+        query, keywords, max_videos, max_concurrent_videos, max_pages_per_video, since_by_video, product_id
+    ))
+
+def iter_youtube_comments(query: str, keywords: list, max_videos: int = 10,
+                          max_concurrent_videos: int = YOUTUBE_MAX_CONCURRENT_VIDEOS,
+                          max_pages_per_video: int = YOUTUBE_MAX_PAGES_PER_VIDEO,
+                          since_by_video: dict | None = None, product_id: int | None = None):
+    """
+    Yields matching YouTube comments video by video as they are fetched.
+    Up to `max_concurrent_videos` videos are paged at the same time. `since_by_video` maps a
+    video ID to the `created_at` of the newest comment already ingested for it (incremental mode).
+    API calls are rate limited and charged to `product_id`'s share of the daily quota; responses
+    served from the scraper response cache cost nothing.
+    """
+    if not YOUTUBE_API_KEY and not replaying():
         print("YouTube API key not found. Skipping YouTube scraping.")
-        return []
+        return
+
+    # The search always asks for max_videos (it costs the same for fewer), so its cache key
+    # doesn't depend on the plan; only a search that reaches the API is budgeted for
+    requested_videos = max_videos
+    if not replaying(): # Replayed runs spend no quota
+        search_cost = 0 if will_serve("youtube_search", _search_params(query, requested_videos)) else SEARCH_COST
+        max_videos, max_pages_per_video = _plan_quota(max_videos, max_pages_per_video, product_id, search_cost)
+    if max_videos == 0:
+        print("YouTube quota budget exhausted for today. Skipping YouTube scraping.")
+        return
 
-    youtube = googleapiclient.discovery.build(
-        "youtube", "v3", developerKey=YOUTUBE_API_KEY
-    )
-    
     print(f" Finding top {max_videos} YouTube videos for query: '{query}'...")
-    video_ids = _get_video_ids(youtube, query, max_videos)
-    print(f"Found {len(video_ids)} videos. Now fetching comments...")
-    
-    all_feedback = []
-    for video_id in video_ids:
-            
-        comments = _get_comments(youtube, video_id, keywords)
-        all_feedback.extend(comments)
-
-    print(f" YouTube scraping complete. Found {len(all_feedback)} total comments.")
-    return all_feedback
+    try:
+        video_ids = _get_video_ids(query, requested_videos, product_id)
+    except Exception as e:
+        if _is_quota_error(e):
+            exhaust_quota("youtube")
+        raise
+    if video_ids is None:
+        print("No YouTube search results (quota budget exhausted or nothing recorded). Skipping YouTube scraping.")
+        return
+    video_ids = video_ids[:max_videos]
+    print(f"Found {len(video_ids)} videos. Now fetching comments ({max_concurrent_videos} at a time)...")
+
+    since_by_video = since_by_video or {}
+
+    def fetch(video_id):
+        return _get_comments(
+            video_id, keywords,
+            max_pages=max_pages_per_video,
+            since=since_by_video.get(video_id),
+            product_id=product_id
+        )
+
+    total_comments = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrent_videos), thread_name_prefix="yt-comments") as executor:
+        # map() keeps results in video order while fetching concurrently
+        for comments in executor.map(fetch, video_ids):
+            total_comments += len(comments)
+            yield from comments
+
+    print(f" YouTube scraping complete. Found {total_comments} total comments.")
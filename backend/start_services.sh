@@ -1,9 +1,12 @@
 #!/bin/bash
 set -e
 export PYTHONPATH=.
-echo "Starting Celery Worker..."
+echo "Starting Celery Workers..."
 # This command now works because Render is in the root and can find 'backend'
-celery -A backend.celery_app worker --loglevel=INFO -P gevent -c 10 &
+# I/O queue: scraping, LLM calls and task orchestration; mostly waiting on the network
+celery -A backend.celery_app worker --loglevel=INFO -Q io -P gevent -c ${IO_WORKER_CONCURRENCY:-20} -n io@%h &
+# CPU queue: embedding and sentiment; one process per core
+celery -A backend.celery_app worker --loglevel=INFO -Q cpu -P prefork -c ${CPU_WORKER_CONCURRENCY:-$(nproc)} -n cpu@%h &
 
 echo "Starting FastAPI API Server..."
 # This command also works now
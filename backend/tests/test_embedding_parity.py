@@ -0,0 +1,26 @@
+"""
+ONNX backends must produce the same vectors as the PyTorch reference, within the cosine
+thresholds in PARITY_THRESHOLDS (fp32 ONNX >= 0.999, int8 ONNX >= 0.97 on every text),
+since points embedded by different backends share one collection and one embedding cache.
+
+    python -m pytest backend/tests
+"""
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+
+from backend.pipeline.embeddings import create_backend
+from backend.benchmarks.embedding_backends import PARITY_THRESHOLDS, corpus, parity
+
+PARITY_TEXTS = corpus(100)
+
+@pytest.fixture(scope="module")
+def reference_vectors():
+    return create_backend("torch").encode(PARITY_TEXTS)
+
+@pytest.mark.parametrize("name", ["onnx", "onnx-int8"])
+def test_onnx_matches_torch(name, reference_vectors):
+    worst, mean = parity(create_backend(name), PARITY_TEXTS, reference_vectors)
+    assert worst >= PARITY_THRESHOLDS[name], f"{name}: min cosine {worst:.5f} (mean {mean:.5f})"